@@ -0,0 +1,103 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Ingest a range of dates (resumable).
+
+Usage: python backfill.py START END [--force]   (dates in YYYYmmdd format)
+
+Dates whose results file is already complete are skipped unless --force
+is given.  Finished dates are recorded in a checkpoint file so that an
+interrupted run picks up where it stopped; the checkpoint is removed
+once the whole range is done.
+"""
+import os
+import sys
+import json
+import threading
+from datetime import datetime
+from datetime import timedelta
+from update_day_records import get_fname, write_day_records
+from parallel import parallel_map
+
+DAY_WORKERS = 2
+CKPT_LOCK = threading.Lock()
+
+def date_range(start_str, end_str):
+    """
+    List the dates from start_str to end_str inclusive (YYYYmmdd format).
+    Dates after yesterday are dropped since those games may not be over.
+    """
+    def dr_inner(start, end):
+        return list(map(lambda a: start + timedelta(days=a),
+                        range((end - start).days + 1)))
+    return dr_inner(datetime.strptime(start_str, "%Y%m%d"),
+                    min(datetime.strptime(end_str, "%Y%m%d"),
+                        datetime.now() - timedelta(days=1)))
+
+def day_complete(date_v):
+    """
+    A results file is complete if it loads and has both player lists
+    """
+    try:
+        with open(get_fname(date_v), 'r', encoding='utf-8') as inf:
+            day_info = json.load(inf)
+    except (OSError, ValueError):
+        return False
+    return isinstance(day_info.get('batters'), list) and \
+        isinstance(day_info.get('pitchers'), list)
+
+def ckpt_name(start_str, end_str):
+    """
+    Name of the checkpoint file for this range
+    """
+    return os.sep.join(['results', f'backfill_{start_str}_{end_str}.json'])
+
+def read_checkpoint(ckpt_file):
+    """
+    Return the set of dates (YYYYmmdd) already finished in this range
+    """
+    if not os.path.exists(ckpt_file):
+        return set()
+    with open(ckpt_file, 'r', encoding='utf-8') as inf:
+        return set(json.load(inf)['done'])
+
+def mark_done(ckpt_file, date_str):
+    """
+    Add date_str to the checkpoint file
+    """
+    with CKPT_LOCK:
+        def md_inner(done):
+            with open(ckpt_file + '.tmp', 'w', encoding='utf-8') as outf:
+                json.dump({'done': sorted(done | {date_str})}, outf)
+            os.replace(ckpt_file + '.tmp', ckpt_file)
+        md_inner(read_checkpoint(ckpt_file))
+
+def backfill(start_str, end_str, force=False, day_workers=DAY_WORKERS,
+             workers=None):
+    """
+    Write results files for every date in the range, day_workers dates
+    at a time (games within a date use up to workers threads)
+    """
+    def bf_inner(ckpt_file, done):
+        def needed(date_v):
+            if date_v.strftime("%Y%m%d") in done:
+                return False
+            return force or not day_complete(date_v)
+        def do_day(date_v):
+            write_day_records(date_v, workers)
+            mark_done(ckpt_file, date_v.strftime("%Y%m%d"))
+            return date_v.strftime("%Y%m%d")
+        return parallel_map(do_day,
+                            list(filter(needed, date_range(start_str,
+                                                           end_str))),
+                            day_workers)
+    def finish(ckpt_file, processed):
+        if os.path.exists(ckpt_file):
+            os.remove(ckpt_file)
+        return processed
+    os.makedirs('results', exist_ok=True)
+    return finish(ckpt_name(start_str, end_str),
+                  bf_inner(ckpt_name(start_str, end_str),
+                           read_checkpoint(ckpt_name(start_str, end_str))))
+
+if __name__ == "__main__":
+    print(backfill(sys.argv[1], sys.argv[2], "--force" in sys.argv[3:]))
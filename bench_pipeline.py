@@ -0,0 +1,212 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Benchmark the scrape/parse hot paths against recorded pages.
+
+    python bench_pipeline.py record YYYYmmdd [fixture_dir]
+    python bench_pipeline.py run [fixture_dir] [repeat]
+
+record downloads the scoreboard, boxscores and stat leaderboards used by
+each stage into fixture_dir.  run replays them (no network) and reports
+per-stage wall time, request count, bytes and peak memory.  Each run is
+saved in bench_results/ and compared with the previous saved run.
+Boxscore pages are not archived (see page_archive) while it runs, and
+the player index is kept in a temporary file so that the stages that
+add players leave data/player_index.json alone.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+from datetime import datetime
+from http_cache import set_cache_file
+from http_client import request_counts, reset_counts
+from page_fixtures import set_record, set_replay
+from page_archive import set_archive, archive_on
+from player_index import set_index_file, index_file
+from web_pages import get_page, cbs_url
+from find_games_given_date import find_games_on_date
+from get_boxscore import get_boxscore
+from parse_boxscore import do_parse_boxscore, parse_box_main
+from cumulative_stats import cumulative_stats
+from find_dup_ids import find_dup_ids
+from update_day_records import get_day_dict
+
+FIXTURE_DIR = "fixtures"
+RESULTS_DIR = "bench_results"
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.05
+
+def gen_stages(date_v):
+    """
+    Return [name, function] pairs.  Each stage function takes the result
+    of the previous stage (so parse_boxscore times parsing alone).
+    """
+    return [["find_games_on_date", lambda _: find_games_on_date(date_v)],
+            ["get_boxscore",
+             lambda games: list(map(lambda a: get_boxscore(cbs_url(a)),
+                                    games))],
+            ["parse_boxscore",
+             lambda raw: list(map(lambda a: parse_box_main(
+                 do_parse_boxscore(a)), raw))],
+            ["cumulative_stats", lambda _: cumulative_stats()],
+            ["find_dup_ids", lambda _: find_dup_ids()],
+            ["ingest_day", lambda _: get_day_dict(date_v)]]
+
+def timed_call(func, arg):
+    """
+    Run func(arg) with an empty page memo; return [result, seconds]
+    """
+    def tc_inner(start):
+        return [func(arg), time.perf_counter() - start]
+    get_page.cache_clear()
+    return tc_inner(time.perf_counter())
+
+def peak_memory(func, arg):
+    """
+    Peak traced memory (bytes) of func(arg)
+    """
+    get_page.cache_clear()
+    tracemalloc.start()
+    try:
+        func(arg)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_stage(stage, arg, repeat):
+    """
+    Time one stage (best of repeat runs), then measure its peak memory.
+    Returns [result, report].
+    """
+    def rs_inner(runs, counts):
+        return [runs[0][0],
+                {"stage": stage[0],
+                 "seconds": min(map(lambda a: a[1], runs)),
+                 "requests": counts["requests"], "bytes": counts["bytes"],
+                 "peak_memory": peak_memory(stage[1], arg)}]
+    def first_run():
+        reset_counts()
+        return [timed_call(stage[1], arg), request_counts()]
+    def all_runs(first):
+        return rs_inner([first[0]] + list(map(
+            lambda _: timed_call(stage[1], arg), range(repeat - 1))),
+                        first[1])
+    return all_runs(first_run())
+
+def run_stages(date_v, repeat):
+    """
+    Run every stage in order, feeding each stage the previous result.
+    Archiving is turned off and the player index is kept in a temporary
+    directory meanwhile.
+    """
+    def rst_inner(stages, prev, reports):
+        if not stages:
+            return reports
+        def next_stage(result_and_report):
+            return rst_inner(stages[1:], result_and_report[0],
+                             reports + [result_and_report[1]])
+        return next_stage(run_stage(stages[0], prev, repeat))
+    def side_effects_off(was_on, was_file):
+        set_archive(False)
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                set_index_file(os.sep.join([tmp_dir, "player_index.json"]))
+                return rst_inner(gen_stages(date_v), None, [])
+        finally:
+            set_index_file(was_file)
+            set_archive(was_on)
+    return side_effects_off(archive_on(), index_file())
+
+def read_meta(fixture_dir):
+    """
+    Fixture metadata (the recorded date)
+    """
+    with open(os.sep.join([fixture_dir, "meta.json"]), 'r',
+              encoding='utf-8') as inf:
+        return json.load(inf)
+
+def record(date_str, fixture_dir=FIXTURE_DIR):
+    """
+    Download the pages used by the stages into fixture_dir
+    """
+    set_cache_file(None)
+    set_record(fixture_dir)
+    try:
+        run_stages(datetime.strptime(date_str, "%Y%m%d"), 1)
+    finally:
+        set_record(None)
+    with open(os.sep.join([fixture_dir, "meta.json"]), 'w',
+              encoding='utf-8') as outf:
+        json.dump({"date": date_str}, outf)
+
+def latest_result():
+    """
+    Most recent saved benchmark run (None if there is none)
+    """
+    if not os.path.isdir(RESULTS_DIR) or not os.listdir(RESULTS_DIR):
+        return None
+    with open(os.sep.join([RESULTS_DIR, sorted(os.listdir(RESULTS_DIR))[-1]]),
+              'r', encoding='utf-8') as inf:
+        return json.load(inf)
+
+def compare(reports, previous):
+    """
+    Print this run next to the previous run, flagging stages that got
+    slower by more than REGRESSION_RATIO (and REGRESSION_MIN_SECONDS)
+    """
+    def old_secs(stage):
+        if previous is None:
+            return None
+        return dict(map(lambda a: [a["stage"], a["seconds"]],
+                        previous["stages"])).get(stage)
+    def cmp_line(report):
+        def flag(old):
+            if old is None:
+                return ""
+            if report["seconds"] > old * REGRESSION_RATIO and \
+                    report["seconds"] - old > REGRESSION_MIN_SECONDS:
+                return f"  REGRESSION (was {old:.3f}s)"
+            return f"  (was {old:.3f}s)"
+        return "".join([f"{report['stage']:20s}{report['seconds']:9.3f}s",
+                        f"{report['requests']:6d} req",
+                        f"{report['bytes'] / 1e6:9.2f} MB",
+                        f"{report['peak_memory'] / 1e6:9.1f} MB peak",
+                        flag(old_secs(report["stage"]))])
+    print("\n".join(map(cmp_line, reports)))
+
+def save_result(result):
+    """
+    Save a benchmark run under bench_results/
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.sep.join([RESULTS_DIR,
+              f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"]), 'w',
+              encoding='utf-8') as outf:
+        json.dump(result, outf, indent=1)
+
+def run(fixture_dir=FIXTURE_DIR, repeat=3):
+    """
+    Replay the fixtures through every stage and report
+    """
+    def run_inner(meta, previous):
+        set_cache_file(None)
+        set_replay(fixture_dir)
+        try:
+            reports = run_stages(datetime.strptime(meta["date"], "%Y%m%d"),
+                                 repeat)
+        finally:
+            set_replay(None)
+        compare(reports, previous)
+        save_result({"fixtures": fixture_dir, "date": meta["date"],
+                     "run_at": datetime.now().isoformat(),
+                     "stages": reports})
+        return reports
+    return run_inner(read_meta(fixture_dir), latest_result())
+
+if __name__ == "__main__":
+    if sys.argv[1] == "record":
+        record(*sys.argv[2:4])
+    else:
+        run(*sys.argv[2:3], *map(int, sys.argv[3:4]))
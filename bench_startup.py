@@ -0,0 +1,61 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Benchmark cold start of the season.py commands.
+
+    python bench_startup.py [repeat]
+
+Each command's modules are imported in a fresh interpreter (the best of
+repeat runs is kept) and compared with starting Python alone and with
+importing pandas.  The heavy packages each command loaded are listed.
+"""
+import sys
+import json
+import time
+import subprocess
+
+HEAVY = ["pandas", "pyarrow", "requests", "bs4"]
+BASELINES = {"python": "pass", "pandas": "import pandas"}
+COMMANDS = {"help": None,
+            "games": "find_games_given_date",
+            "standings": "standings",
+            "teams": "get_mlb_teams",
+            "dups": "find_dup_ids",
+            "watch": "watch_games",
+            "daily": "update_day_records"}
+
+def command_code(module):
+    """
+    Code that starts season.py and imports what a command would
+    """
+    if module is None:
+        return "import season; season.get_parser()"
+    return f"import season; season.get_parser(); import {module}"
+
+def time_code(code, repeat):
+    """
+    Best wall time (seconds) of running code in a fresh interpreter, and
+    the heavy packages it loaded
+    """
+    def one_run(_):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", "; ".join([
+            code, "import sys", f"print(' '.join(m for m in {HEAVY!r} "
+            "if m in sys.modules))"])], check=True, capture_output=True,
+                             text=True).stdout
+        return [time.perf_counter() - start, out.split()]
+    return min(map(one_run, range(repeat)), key=lambda a: a[0])
+
+def bench_startup(repeat=3):
+    """
+    Return {name: {'seconds': s, 'loaded': [heavy packages]}}
+    """
+    def entry(timing):
+        return {"seconds": round(timing[0], 3), "loaded": timing[1]}
+    return dict(
+        list(map(lambda a: [a, entry(time_code(BASELINES[a], repeat))],
+                 BASELINES)) +
+        list(map(lambda a: [a, entry(time_code(command_code(COMMANDS[a]),
+                                               repeat))], COMMANDS)))
+
+if __name__ == "__main__":
+    print(json.dumps(bench_startup(*map(int, sys.argv[1:2])), indent=1))
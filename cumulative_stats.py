@@ -4,9 +4,11 @@ Get all players from the regular season stats page
 """
 import os
 import json
-import requests
-from bs4 import BeautifulSoup
+from io import StringIO
 import pandas as pd
+from soup_parse import make_soup, PLAYER_NAMES
+from web_pages import fetch_page
+from parallel import paginate
 
 def gen_url(position):
     """
@@ -18,43 +20,49 @@ def gen_url(position):
                          f"?page={pg_no}"])
     return inner_gen_url
 
-def get_soup_fields(url):
+def get_soup_fields(req_text):
     """
     Extract soup result sets containing full player name information
     """
     def iget_soup():
-        return BeautifulSoup(requests.get(url, timeout=600).text,
-                             "html.parser")
+        return make_soup(req_text, PLAYER_NAMES)
     def iget_tags():
         return iget_soup().find_all(class_="CellPlayerName--long")
     return list(map(lambda a: a.find_all("a", href=True), iget_tags()))
 
-def extract_page(position):
+def read_stat_page(position):
     """
-    Extract the ids (found using soup) and pandas tables for all pages
+    Extract the ids (found using soup) and pandas table for one page.
+    Both come from a single download of the page.
     """
-    def in_extract(pg_no):
-        def curry_url(url):
+    def in_read(pg_no):
+        def curry_text(req_text):
             def curry_soup(soup_fields):
                 def curry_table(pd_info):
                     def make_record(indx):
                         return [soup_fields[indx][0]['href'], pd_info[indx]]
-                    def process_data():
-                        return list(map(make_record, range(len(soup_fields))))
-                    return process_data() + extract_page(position)(pg_no + 1)
+                    return list(map(make_record, range(len(soup_fields))))
                 if not soup_fields:
                     return []
-                return curry_table(pd.read_html(url)[0].transpose().to_dict())
-            return curry_soup(get_soup_fields(url))
-        return curry_url(gen_url(position)(pg_no))
-    return in_extract
+                return curry_table(pd.read_html(StringIO(req_text))[0]
+                                   .to_dict(orient='records'))
+            return curry_soup(get_soup_fields(req_text))
+        return curry_text(fetch_page(gen_url(position)(pg_no)))
+    return in_read
 
-def cumulative_stats():
+def extract_page(position, workers=None):
+    """
+    Stream the ids and pandas table records for all pages (pages are
+    read ahead in parallel, stopping at the first empty page)
+    """
+    return paginate(read_stat_page(position), workers)
+
+def cumulative_stats(workers=None):
     """
     Return stats for both batters and pitchers
     """
     def pos_stats(position):
-        return extract_page(position)(1)
+        return extract_page(position, workers)
     return {"batting": dict(pos_stats("batting")),
             "pitching": dict(pos_stats("pitching"))}
 
@@ -3,40 +3,35 @@
 Find duplicate player names when names are formatted as first initial
 followed by the last name
 """
-import requests
-from bs4 import BeautifulSoup
+from soup_parse import get_links
+from web_pages import fetch_page
+from parallel import paginate
+from player_index import add_players, get_index, name_collisions
 
-def read_plyrs(position):
+def read_plyrs(position, workers=None):
     """
     Extract the data from cbs websites for position (batting and pitching)
     """
-    def read_pages(page_no):
-        def test_info(p_list):
-            if not p_list:
-                return p_list
-            return p_list + read_pages(page_no + 1)
-        def get_soup(page):
-            return BeautifulSoup(requests.get(page, timeout=600).text,
-                                 "html.parser")
+    def read_page(page_no):
+        def get_anchors(page):
+            return get_links(fetch_page(page))
         def get_page():
             return "https://www.cbssports.com/mlb/stats/player/" + \
                 f"{position}/al/regular/all-pos/all/?page={page_no}"
-        def parse_it(in_soup):
+        def parse_it(anchors):
             def get_players(pdata):
                 return pdata['href'].startswith('/mlb/players/')
             def rm_extra():
-                return in_soup.find_all("a", href=True)
+                return anchors
             def rm_non_pl():
                 return list(filter(get_players, rm_extra()))
             def rm_empties(plyr_ref):
                 return len(plyr_ref['href']) > 13
-            return test_info(list(filter(rm_empties, rm_non_pl())))
-        def gen_info():
-            return parse_it(get_soup(get_page()))
-        return test_info(gen_info())
+            return list(filter(rm_empties, rm_non_pl()))
+        return extract_href(parse_it(get_anchors(get_page())))
     def extract_href(p_soup):
         return list(map(lambda a: a['href'], p_soup))
-    return list(set(extract_href(read_pages(1))))
+    return list(set(paginate(read_page, workers)))
 
 def find_dup_ids():
     """
@@ -44,8 +39,12 @@ def find_dup_ids():
     """
     def add_parts(two_lists):
         return list(set(two_lists[0] + two_lists[1]))
+    def seed_index(p_list):
+        add_players(p_list)
+        return p_list
     def get_all_player_ids():
-        return add_parts(list(map(read_plyrs, ["batting", "pitching"])))
+        return seed_index(add_parts(list(map(read_plyrs,
+                                             ["batting", "pitching"]))))
     def num_ids(p_list):
         return list(map(lambda a: a.split("/")[-3], p_list))
     def set_nm_prts(fandl):
@@ -74,5 +73,15 @@ def find_dup_ids():
         return list(map(lambda a: a[0], double_answer))
     return find_double_ids(compare_pairs())
 
+def indexed_dup_ids():
+    """
+    Duplicate short names found with a player index query.  The index is
+    filled by every boxscore parsed; it is seeded with a crawl of the stat
+    pages (find_dup_ids) if it is empty.
+    """
+    if not get_index():
+        find_dup_ids()
+    return sorted(name_collisions())
+
 if __name__ == "__main__":
-    print(find_dup_ids())
+    print(indexed_dup_ids())
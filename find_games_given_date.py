@@ -2,10 +2,16 @@
 """
 Given a date, return list of boxscores
 """
+import re
+from collections import namedtuple
 from datetime import datetime
 from datetime import timedelta
-import requests
-from bs4 import BeautifulSoup
+from soup_parse import make_soup, get_links
+from web_pages import get_page, keep_page, drop_page, cbs_url
+from parallel import parallel_map
+from run_metrics import timed
+from get_mlb_teams import game_id_info
+from get_boxscore import extract_team_info
 
 def get_gdate(date_v):
     """
@@ -18,79 +24,150 @@ def get_req(date_v):
     """
     Read a url
     """
-    return requests.get(get_gdate(date_v), timeout=600).text
+    return get_page(get_gdate(date_v))
 
-def get_soup(date_v):
+def msnp_req(url_v):
     """
-    Get the scoreboard with links to boxscores
+    Read url (checking for postponed games).  The page is kept so that
+    get_boxscore can take it without downloading it again.
     """
-    return BeautifulSoup(get_req(date_v), "html.parser")
+    return keep_page(cbs_url(url_v))
 
-def get_gameinfo(date_v):
+def msnp_find_hrefs(url_v):
     """
-    Extract game links
+    Get hrefs (checking for postponed games)
     """
-    return get_soup(date_v).find_all("a", href=True)
+    return get_links(msnp_req(url_v))
 
-def get_games(date_v):
+def msnp_find_pp(url_v):
     """
-    Scan game page for this day
+    Postponed games are determined by having too few player references
     """
-    return list(filter(lambda a: a.attrs['href'].startswith(
-            '/mlb/gametracker/boxscore/'), get_gameinfo(date_v)))
+    return list(filter(lambda a: "playerpage" in a.attrs['href'],
+                      msnp_find_hrefs(url_v)))
 
-def msnp_req(url_v):
+@timed("postponement_check")
+def make_sure_not_postponed(url_v):
     """
-    Read url (checking for postponed games)
+    Remove postponed games from list
     """
-    return requests.get("https://www.cbssports.com" + url_v,
-                timeout=600).text
+    if len(msnp_find_pp(url_v)) > 18:
+        return True
+    drop_page(cbs_url(url_v))
+    return False
+
+GameInfo = namedtuple("GameInfo", ["url", "status", "away", "home"])
 
-def msnp_bs(url_v):
+FINAL = "final"
+POSTPONED = "postponed"
+SUSPENDED = "suspended"
+IN_PROGRESS = "in_progress"
+SCHEDULED = "scheduled"
+UNKNOWN = "unknown"
+PLAYED = (FINAL, SUSPENDED, IN_PROGRESS)
+NOT_PLAYED = (POSTPONED,)
+
+STATUS_PATTERNS = [
+    [POSTPONED, re.compile(r"\b(Postponed|PPD|Canceled|Cancelled)\b", re.I)],
+    [SUSPENDED, re.compile(r"\bSuspended\b", re.I)],
+    [FINAL, re.compile(r"\bFinal\b", re.I)],
+    [IN_PROGRESS, re.compile(r"\b(Top|Bot|Bottom|Mid|Middle|End)\b\s*\d")],
+    [SCHEDULED, re.compile(r"\d{1,2}:\d{2}\s*(AM|PM|ET)", re.I)]]
+CARD_CLASS = re.compile(r"score-?card", re.I)
+
+def is_boxscore_link(href):
     """
-    Get Beautiful Soup data (checking for postponed games)
+    Check if href is a link to a boxscore
     """
-    return BeautifulSoup(msnp_req(url_v), "html.parser")
+    return href.startswith('/mlb/gametracker/boxscore/')
 
-def msnp_find_hrefs(url_v):
+def game_card(anchor):
+    """
+    The game's card on the scoreboard: the nearest element around a
+    boxscore link with a score card class.  Without one, only the link's
+    parent is used (so its status reads as unknown rather than being
+    taken from text elsewhere on the page).
+    """
+    def gc_inner(card):
+        if card is None:
+            return anchor.parent
+        return card
+    return gc_inner(anchor.find_parent(class_=CARD_CLASS))
+
+def card_status(card_text):
     """
-    Get hrefs (checking for postponed games)
+    Game status shown on a scoreboard card
     """
-    return msnp_bs(url_v).find_all("a", href=True)
+    def cs_inner(found):
+        if not found:
+            return UNKNOWN
+        return found[0][0]
+    return cs_inner(list(filter(lambda a: a[1].search(card_text),
+                                STATUS_PATTERNS)))
 
-def msnp_find_pp(url_v):
+def game_teams(url_v):
     """
-    Postponed games are determined by having too few player references
+    [away, home] team abbreviations from a boxscore link ([None, None]
+    if the link does not hold a boxscore id)
     """
-    return list(filter(lambda a: "playerpage" in a.attrs['href'],
-                      msnp_find_hrefs(url_v)))
+    try:
+        return game_id_info(extract_team_info(url_v))[1:]
+    except ValueError:
+        return [None, None]
 
-def make_sure_not_postponed(url_v):
+@timed("scoreboard")
+def find_game_statuses(date_v, req_text=None):
+    """
+    Typed game list (url, status, away, home) for date_v, read from the
+    single scoreboard page (req_text if it has already been read).  No
+    boxscores are downloaded.
+    """
+    def fgs_inner(anchors):
+        def game_info(anchor):
+            return GameInfo(anchor['href'],
+                            card_status(game_card(anchor).get_text(" ")),
+                            *game_teams(anchor['href']))
+        return list(map(game_info, dict(map(lambda a: [a['href'], a],
+                                            anchors)).values()))
+    return fgs_inner(list(filter(lambda a: is_boxscore_link(a['href']),
+                                 make_soup(req_text or get_req(date_v))
+                                 .find_all("a", href=True))))
+
+def verify_played(game):
     """
-    Remove postponed games from list
+    Decide whether a game was played.  Only games whose status could not
+    be read from the scoreboard cost a boxscore download (and that page
+    is kept for parsing).
     """
-    if len(msnp_find_pp(url_v)) > 18:
+    if game.status in PLAYED:
         return True
-    return False
+    if game.status in NOT_PLAYED:
+        return False
+    return make_sure_not_postponed(game.url)
 
-def find_games_on_date(date_v):
+def find_games_on_date(date_v, workers=None):
     """
-    Return extracted boxscore links
+    Return extracted boxscore links for games that were played
     """
-    return list(filter(make_sure_not_postponed,
-            list(map(lambda a: a.attrs['href'], get_games(date_v)))))
+    def fgod_inner(games):
+        def keep_played(played):
+            return list(map(lambda a: a[0].url,
+                            filter(lambda a: a[1], zip(games, played))))
+        return keep_played(parallel_map(verify_played, games, workers))
+    return fgod_inner(find_game_statuses(date_v))
 
-def find_games_given_date(date_str):
+def find_games_given_date(date_str, workers=None):
     """
     Date_str in YYYYmmdd format
     """
-    return find_games_on_date(datetime.strptime(date_str, "%Y%m%d"))
+    return find_games_on_date(datetime.strptime(date_str, "%Y%m%d"),
+                              workers)
 
-def find_yesterdays_games():
+def find_yesterdays_games(workers=None):
     """
     Called by update_day_records
     """
-    return find_games_on_date(datetime.now() - timedelta(days=1))
+    return find_games_on_date(datetime.now() - timedelta(days=1), workers)
 
 if __name__ == "__main__":
     print(find_yesterdays_games())
@@ -1,10 +1,14 @@
 # Copyright (C) 2023 Warren Usui, MIT License
 """
 Extract boxscore data (data will be sorted out by parse_boxscore)
+
+pandas is imported when the first tables are read, not with the module.
 """
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from io import StringIO
+from soup_parse import make_soup, get_links, PANELS
+from web_pages import take_page
+from run_metrics import timed
+from page_archive import archive_page
 
 def get_ppage_links(ahref_clause):
     """
@@ -14,11 +18,11 @@ def get_ppage_links(ahref_clause):
         return ahref_clause['href']
     return ' '
 
-def get_player_links(soup):
+def get_player_links(links):
     """
-    Extract player page links for all players
+    Extract player page links for all players (links are <a> tags)
     """
-    return list(set(list(map(get_ppage_links, soup.find_all("a", href=True)))))
+    return list(set(list(map(get_ppage_links, links))))
 
 def id_filter_non_links(string_list):
     """
@@ -43,34 +47,48 @@ def get_sb_headers(soup):
     return list(soup.find_all("div",
                 class_="gametracker-panel--always-show-desktop")[6].children)
 
+@timed("soup_parse")
 def get_scrape_info(req_text):
     """
     Scrape the player list and stolen base information
     """
-    def gsi_inner(soup):
-        return [["players", id_filter_non_links(get_player_links(soup))],
-                ["sb_info", get_sb_info(soup)],
-                ["sb_headers", get_sb_headers(soup)]]
-    return gsi_inner(BeautifulSoup(req_text, "html.parser"))
+    def gsi_inner(panels):
+        return [["players", id_filter_non_links(get_player_links(
+                    get_links(req_text)))],
+                ["sb_info", get_sb_info(panels)],
+                ["sb_headers", get_sb_headers(panels)]]
+    return gsi_inner(make_soup(req_text, PANELS))
 
-def get_tables(url_name):
+@timed("read_html")
+def get_tables(req_text):
     """
     Extract the main tables as dataframes
     """
+    # pylint: disable=import-outside-toplevel
+    import pandas as pd
     def gt_inner(pd_info):
         return list(map(lambda a: pd_info[a], list(range(1,9,2))))
-    return [["tables", gt_inner(pd.read_html(url_name))]]
+    return [["tables", gt_inner(pd.read_html(StringIO(req_text)))]]
 
 def extract_team_info(url_name):
     """
-    Extract the abbreviations for the teams playing
+    Extract the boxscore id (date and teams playing) from the url
+    ("MLB_20230403_NYM@MIL")
     """
     return list(filter(lambda a: a, url_name.split('/')))[-1]
 
-def get_boxscore(url_v):
+def boxscore_from_text(url_v, req_text):
     """
-    Extract boxscore data (results will be used by parse_boxscore)
+    Extract boxscore data from an already downloaded page
     """
     return dict([['game_info', extract_team_info(url_v)]] +
-            get_scrape_info(requests.get(url_v, timeout=600).text) +
-            get_tables(url_v))
+            get_scrape_info(req_text) + get_tables(req_text))
+
+@timed("get_boxscore")
+def get_boxscore(url_v):
+    """
+    Extract boxscore data (results will be used by parse_boxscore).  The
+    page is saved in the archive (see page_archive) and is not kept in
+    memory once parsed (see web_pages).
+    """
+    return boxscore_from_text(url_v, archive_page(url_v, take_page(url_v)))
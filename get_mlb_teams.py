@@ -1,10 +1,37 @@
 # Copyright (C) 2023 Warren Usui, MIT License
 """
-Create abbrev -> full team name json and full team name -> abbrev json
+Team metadata for both leagues: abbreviation, full name and league.
+
+refresh_teams scrapes the teams page at most once every TEAMS_MAX_AGE
+and saves it in data/team_meta.json (a stale file is still used if the
+page cannot be read).  Each team's league is taken from the league
+header ("American League", "AL East", ...) above its link.  Everything
+else only reads that file, once per process, into an abbreviation <->
+name <-> league lookup; nothing but refresh_teams goes to the network.
+save_mlb_teams also writes the older abbrev -> name (teams.json) and
+name -> abbrev (abbrevs.json) files.
+
+Boxscore ids ("MLB_20230403_NYM@MIL") are split into date and teams by
+game_id_info, which checks the teams against the lookup and is memoized
+so each game is parsed once.
 """
 import os
+import re
+import sys
 import json
-from oldies.common import get_soup
+import time
+from functools import lru_cache, reduce
+from soup_parse import make_soup
+from web_pages import fetch_page
+from season_totals import write_json
+
+TEAMS_URL = "https://www.cbssports.com/mlb/teams/"
+META_FILE = os.sep.join(["data", "team_meta.json"])
+TEAMS_MAX_AGE = 7 * 24 * 60 * 60
+LEAGUES = ["AL", "NL"]
+LEAGUE_TEXT = re.compile(r'\b(American|National) League\b|'
+                         r'\b(AL|NL) (East|Central|West)\b')
+GAME_ID = re.compile(r'^MLB_(\d{8})_([A-Z]+)@([A-Z]+)$')
 
 def fix_name(ntext):
     """
@@ -12,11 +39,27 @@ def fix_name(ntext):
     """
     return " ".join(list(map(lambda a: a.capitalize(), ntext.split('-'))))
 
-def split_data(team_info):
+def team_league(fline):
+    """
+    League ("AL" or "NL") of the nearest league header before a team
+    link (None if there is none)
+    """
+    def tl_inner(header):
+        if header is None:
+            return None
+        if re.search(r'\b(American|AL)\b', header):
+            return LEAGUES[0]
+        return LEAGUES[1]
+    return tl_inner(fline.find_previous(string=LEAGUE_TEXT))
+
+def split_data(fline):
     """
-    Return [abbreviation, team name]
+    Return {'abbrev', 'name', 'league'} for a team link
     """
-    return [team_info[3], fix_name(team_info[4])]
+    def sd_inner(team_info):
+        return {'abbrev': team_info[3], 'name': fix_name(team_info[4]),
+                'league': team_league(fline)}
+    return sd_inner(fline['href'].split("/"))
 
 def parse_team(fline):
     """
@@ -24,8 +67,8 @@ def parse_team(fline):
     """
     if fline['href'].startswith("/mlb/teams/"):
         if fline['href'].endswith("stats/"):
-            return split_data(fline['href'].split("/"))
-    return []
+            return split_data(fline)
+    return {}
 
 def scan_teams(soup):
     """
@@ -33,23 +76,143 @@ def scan_teams(soup):
     """
     return list(map(parse_team, soup.find_all("a", href=True)))
 
-def collect_data():
+def collect_data(max_age=None):
     """
     Read team name from web.
     """
-    return scan_teams(get_soup("https://www.cbssports.com/mlb/teams/"))
+    return scan_teams(make_soup(fetch_page(TEAMS_URL, max_age)))
 
 def clean_data(in_data):
     """
-    Remove empty entries from list
+    Remove empty and repeated entries from list (keeping page order)
+    """
+    def add_team(teams, team):
+        teams.setdefault(team['abbrev'], team)
+        return teams
+    return list(reduce(add_team, filter(None, in_data), {}).values())
+
+def scrape_teams(max_age=None):
+    """
+    Team metadata for both leagues, read from the teams page
+    """
+    return clean_data(collect_data(max_age))
+
+def meta_is_fresh():
+    """
+    True if the saved metadata is newer than TEAMS_MAX_AGE
+    """
+    return os.path.exists(META_FILE) and \
+        time.time() - os.path.getmtime(META_FILE) < TEAMS_MAX_AGE
+
+def read_meta():
+    """
+    The saved team metadata ([] if there is none)
+    """
+    if not os.path.exists(META_FILE):
+        return []
+    with open(META_FILE, 'r', encoding='utf-8') as inf:
+        return json.load(inf)
+
+def save_meta(teams):
+    """
+    Save team metadata (via a temporary file and rename)
     """
-    return list(filter(lambda a: a, in_data))
+    write_json(META_FILE, teams)
+    return teams
+
+def refresh_teams(force=False):
+    """
+    Scrape and save the team metadata if the saved copy is older than
+    TEAMS_MAX_AGE (or force is set).  Falls back to the saved copy if
+    the page cannot be read or lists no teams.
+    """
+    if meta_is_fresh() and not force:
+        return read_meta()
+    try:
+        teams = scrape_teams(0 if force else None)
+    except OSError:
+        return read_meta()
+    if not teams:
+        return read_meta()
+    save_meta(teams)
+    get_team_lookup.cache_clear()
+    game_id_info.cache_clear()
+    return teams
+
+@lru_cache(maxsize=1)
+def get_team_lookup():
+    """
+    {'abbrev': {abbrev: team}, 'name': {lower case name: team},
+    'league': {league: [abbrevs]}} built once per process from the saved
+    metadata (empty if there is none; see refresh_teams).  Nicknames
+    ("yankees") are also accepted as names unless two teams share them
+    ("sox").
+    """
+    def nicknames(teams):
+        def nick(team):
+            return team['name'].split()[-1].lower()
+        return list(filter(lambda a: list(map(nick, teams)).count(a[0]) == 1,
+                           map(lambda a: [nick(a), a], teams)))
+    def gtl_inner(teams):
+        return {'abbrev': dict(map(lambda a: [a['abbrev'], a], teams)),
+                'name': dict(nicknames(teams) + list(map(
+                    lambda a: [a['name'].lower(), a], teams))),
+                'league': dict(map(lambda a: [a, list(map(
+                    lambda b: b['abbrev'], filter(
+                        lambda b: b['league'] == a, teams)))], LEAGUES))}
+    return gtl_inner(read_meta())
+
+def require_teams():
+    """
+    Raise ValueError if there is no saved team metadata (looking again
+    for a file saved since the lookup was built)
+    """
+    if not get_team_lookup()['abbrev']:
+        get_team_lookup.cache_clear()
+    if not get_team_lookup()['abbrev']:
+        raise ValueError(f"no team metadata in {META_FILE} (run "
+                         "'python season.py teams' first)")
+
+def find_team(team):
+    """
+    Metadata for a team given by abbreviation, full name or nickname
+    (None if unknown)
+    """
+    return get_team_lookup()['abbrev'].get(team.upper()) or \
+        get_team_lookup()['name'].get(team.lower())
+
+def team_abbrev(team):
+    """
+    Abbreviation for a team given by abbreviation, name or nickname (the
+    text unchanged if the team is unknown)
+    """
+    return (find_team(team) or {'abbrev': team})['abbrev']
+
+def league_teams(league):
+    """
+    Abbreviations of the teams in a league ("AL" or "NL")
+    """
+    return get_team_lookup()['league'].get(league.upper(), [])
+
+@lru_cache(maxsize=4096)
+def game_id_info(game_id):
+    """
+    [date as mm/dd/YYYY, away abbrev, home abbrev] for a boxscore id such
+    as "MLB_20230403_NYM@MIL".  The teams are looked up in the team
+    metadata; an abbreviation it does not know is passed on unchanged.
+    """
+    def gii_inner(match):
+        return [f"{match[1][4:6]}/{match[1][6:8]}/{match[1][0:4]}",
+                team_abbrev(match[2]), team_abbrev(match[3])]
+    if GAME_ID.match(game_id) is None:
+        raise ValueError(f"not a boxscore id: {game_id}")
+    return gii_inner(GAME_ID.match(game_id))
 
 def get_mlb_teams():
     """
-    Collect data, grab only AL part, make dict
+    {abbrev: team name} for both leagues
     """
-    return dict(clean_data(collect_data())[0:15])
+    return dict(map(lambda a: [a['abbrev'], a['name']], refresh_teams()))
 
 def lflip(t_info):
     """
@@ -78,11 +241,12 @@ def sv_mlb_teams(t_info):
     do_dump("teams.json")(t_info)
     do_dump("abbrevs.json")(flip(t_info))
 
-def save_mlb_teams():
+def save_mlb_teams(force=False):
     """
-    Do computations (in get_mlb_teams) and pass to output routine
+    Refresh the team metadata and write the name/abbreviation files
     """
+    refresh_teams(force)
     sv_mlb_teams(get_mlb_teams())
 
 if __name__ == "__main__":
-    save_mlb_teams()
+    save_mlb_teams("--force" in sys.argv[1:])
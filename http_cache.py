@@ -0,0 +1,202 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Persistent on-disk cache of downloaded pages.
+
+Pages are stored zlib-compressed in a SQLite file keyed by url.  Each
+kind of page has a time to live (finished boxscores never expire), stale
+pages are revalidated with ETag/Last-Modified, and the least recently
+used pages are evicted when the cache grows past MAX_CACHE_BYTES.
+"""
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+from datetime import datetime
+from datetime import timedelta
+from http_client import http_get
+from run_metrics import count
+
+CACHE_FILE = os.sep.join(["cache", "http_cache.sqlite"])
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+FOREVER = None
+SHORT_TTL = 10 * 60
+LEADERBOARD_TTL = 60 * 60
+DEFAULT_TTL = 24 * 60 * 60
+FINAL_AFTER_DAYS = 2
+
+_LOCAL = threading.local()
+_SETTINGS = {"file": os.environ.get("SEASON_HTTP_CACHE", CACHE_FILE)}
+
+def set_cache_file(cache_file):
+    """
+    Use a different cache file.  None (or "off") turns the cache off.
+    """
+    _SETTINGS["file"] = cache_file
+    _LOCAL.__dict__.clear()
+
+def cache_enabled():
+    """
+    True if pages are being cached on disk
+    """
+    return _SETTINGS["file"] not in (None, "", "off")
+
+def boxscore_ttl(url, fetched):
+    """
+    A boxscore copy fetched (or revalidated) at least FINAL_AFTER_DAYS
+    after the game's date is final and is kept forever.  Copies fetched
+    earlier may be from before the game ended, however old the game is
+    now, so they are revalidated.
+    """
+    def bttl_inner(date_part):
+        if not date_part:
+            return SHORT_TTL
+        if datetime.fromtimestamp(fetched) >= datetime.strptime(
+                date_part.group(1), "%Y%m%d") + \
+                timedelta(days=FINAL_AFTER_DAYS):
+            return FOREVER
+        return SHORT_TTL
+    return bttl_inner(re.search(r"_(\d{8})_", url))
+
+def page_ttl(url, fetched):
+    """
+    Time to live (seconds, or FOREVER) for a url fetched at time fetched,
+    based on its page type
+    """
+    if "/gametracker/boxscore/" in url:
+        return boxscore_ttl(url, fetched)
+    if "/scoreboard/" in url:
+        return SHORT_TTL
+    if "/stats/player/" in url:
+        return LEADERBOARD_TTL
+    return DEFAULT_TTL
+
+def get_conn():
+    """
+    Return this thread's connection to the cache file
+    """
+    if getattr(_LOCAL, "conn", None) is None:
+        if os.path.dirname(_SETTINGS["file"]):
+            os.makedirs(os.path.dirname(_SETTINGS["file"]), exist_ok=True)
+        _LOCAL.conn = sqlite3.connect(_SETTINGS["file"], timeout=60)
+        _LOCAL.conn.execute("PRAGMA journal_mode=WAL")
+        _LOCAL.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, "
+            "body BLOB, etag TEXT, last_modified TEXT, fetched REAL, "
+            "accessed REAL, size INTEGER)")
+        _LOCAL.conn.execute(
+            "CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+    return _LOCAL.conn
+
+def lookup(url):
+    """
+    Return (body, etag, last_modified, fetched) for url, or None
+    """
+    return get_conn().execute(
+        "SELECT body, etag, last_modified, fetched FROM pages WHERE url = ?",
+        (url,)).fetchone()
+
+def is_fresh(url, fetched, max_age):
+    """
+    Check if a page fetched at time fetched can be used without
+    revalidation
+    """
+    def fresh_inner(ttl):
+        if ttl is FOREVER:
+            return True
+        return time.time() - fetched < ttl
+    if max_age is not None:
+        return time.time() - fetched < max_age
+    return fresh_inner(page_ttl(url, fetched))
+
+def unpack(body):
+    """
+    Decompress a stored page
+    """
+    return zlib.decompress(body).decode("utf-8")
+
+def touch(url, fetched=None):
+    """
+    Record a use (and optionally a successful revalidation) of a page
+    """
+    with get_conn() as conn:
+        if fetched is None:
+            conn.execute("UPDATE pages SET accessed = ? WHERE url = ?",
+                         (time.time(), url))
+        else:
+            conn.execute("UPDATE pages SET accessed = ?, fetched = ? "
+                         "WHERE url = ?", (time.time(), fetched, url))
+
+def evict(conn):
+    """
+    Drop least recently used pages until the cache fits MAX_CACHE_BYTES
+    """
+    def over_limit():
+        return (conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages")
+                .fetchone()[0] > MAX_CACHE_BYTES)
+    while over_limit():
+        conn.execute("DELETE FROM pages WHERE url IN (SELECT url FROM pages "
+                     "ORDER BY accessed LIMIT 16)")
+
+def store(url, text, headers):
+    """
+    Save a downloaded page along with its validators
+    """
+    def store_inner(body):
+        with get_conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, headers.get("ETag"),
+                 headers.get("Last-Modified"), time.time(), time.time(),
+                 len(body)))
+            evict(conn)
+    store_inner(zlib.compress(text.encode("utf-8")))
+
+def validators(row):
+    """
+    Conditional request headers for a stale cached page
+    """
+    def add_hdr(pair):
+        return pair[1] is not None
+    if row is None:
+        return {}
+    return dict(filter(add_hdr, [["If-None-Match", row[1]],
+                                 ["If-Modified-Since", row[2]]]))
+
+def download(url, headers):
+    """
+    Go to the network for a page
+    """
+    return http_get(url, headers)
+
+def revalidate(url, row):
+    """
+    Download url (conditionally if we have an older copy) and update
+    the cache
+    """
+    def reval_inner(resp):
+        if resp.status_code == 304 and row is not None:
+            count("cache_revalidated")
+            touch(url, time.time())
+            return unpack(row[0])
+        count("cache_misses")
+        if resp.status_code == 200:
+            store(url, resp.text, resp.headers)
+        return resp.text
+    return reval_inner(download(url, validators(row)))
+
+def cached_get(url, max_age=None):
+    """
+    Return the text of url, from the cache when the stored copy is still
+    fresh.  max_age (seconds) overrides the page type's time to live.
+    """
+    def cget_inner(row):
+        if row is not None and is_fresh(url, row[3], max_age):
+            count("cache_hits")
+            touch(url)
+            return unpack(row[0])
+        return revalidate(url, row)
+    if not cache_enabled():
+        return download(url, {}).text
+    return cget_inner(lookup(url))
@@ -0,0 +1,112 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Shared HTTP client: one pooled keep-alive session, per-host rate
+limiting, separate connect and read timeouts, and retries with jittered
+exponential backoff.  requests is imported when the first page is
+fetched, so commands served from the page cache never load it.
+"""
+import time
+import random
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+from parallel import get_workers
+from page_fixtures import replay_active, replay_get, record_page
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+MIN_HOST_INTERVAL = 0.2
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_HOST_LOCK = threading.Lock()
+_NEXT_SLOT = {}
+_COUNT_LOCK = threading.Lock()
+_COUNTS = {"requests": 0, "bytes": 0}
+
+def count_request(nbytes):
+    """
+    Add a request (of nbytes bytes) to the running totals
+    """
+    with _COUNT_LOCK:
+        _COUNTS["requests"] += 1
+        _COUNTS["bytes"] += nbytes
+
+def request_counts():
+    """
+    Return {"requests": n, "bytes": n} since the last reset_counts
+    """
+    with _COUNT_LOCK:
+        return dict(_COUNTS)
+
+def reset_counts():
+    """
+    Zero the request totals
+    """
+    with _COUNT_LOCK:
+        _COUNTS.update({"requests": 0, "bytes": 0})
+
+@lru_cache(maxsize=1)
+def get_session():
+    """
+    Return the session shared by all modules (connections are pooled and
+    kept alive between requests)
+    """
+    # pylint: disable=import-outside-toplevel
+    import requests
+    from requests.adapters import HTTPAdapter
+    def mount_adapter(session):
+        def mount_inner(adapter):
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            return session
+        return mount_inner(HTTPAdapter(pool_connections=4,
+                                       pool_maxsize=2 * get_workers()))
+    return mount_adapter(requests.Session())
+
+def wait_for_host(url):
+    """
+    Space requests to the same host at least MIN_HOST_INTERVAL apart
+    """
+    def wfh_inner(host, now):
+        with _HOST_LOCK:
+            slot = max(now, _NEXT_SLOT.get(host, now))
+            _NEXT_SLOT[host] = slot + MIN_HOST_INTERVAL
+        return slot - now
+    time.sleep(max(0.0, wfh_inner(urlsplit(url).netloc, time.monotonic())))
+
+def backoff_delay(attempt):
+    """
+    Exponential backoff with full jitter
+    """
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def http_get(url, headers=None, attempt=0):
+    """
+    GET url with the shared session.  Connection errors, timeouts and
+    RETRY_STATUS responses are retried up to MAX_RETRIES times.
+    """
+    def retry():
+        time.sleep(backoff_delay(attempt))
+        return http_get(url, headers, attempt + 1)
+    def counted(resp):
+        count_request(len(resp.content))
+        record_page(url, resp)
+        return resp
+    if replay_active():
+        return counted(replay_get(url))
+    # pylint: disable=import-outside-toplevel
+    import requests
+    wait_for_host(url)
+    try:
+        resp = get_session().get(url, headers=headers,
+                                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    except (requests.ConnectionError, requests.Timeout):
+        if attempt >= MAX_RETRIES:
+            raise
+        return retry()
+    if resp.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+        return retry()
+    return counted(resp)
@@ -0,0 +1,180 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Dated history of the cumulative leaderboards (see cumulative_stats).
+
+The history is a full base snapshot plus one small delta per refresh:
+
+    results/leaderboards/base_YYYYMMDD.json   {kind: {href: line}}
+    results/leaderboards/YYYYMMDD.json        {kind: {href: changes}}
+
+A delta holds only the players whose lines changed since the previous
+refresh, and for each of them only the changed fields (None for a
+player who dropped off the leaderboard).  The stats as of a date are
+the latest base on or before it with the later deltas applied.  Every
+REBASE_DAYS deltas a new base is written so that lookups stay short;
+the delta for a base's date is still written so that change_since sees
+that day's changes.  Refreshes go in date order: a date before the last
+recorded one is refused (the latest date may be refreshed again).
+Only refresh scrapes, so it alone imports cumulative_stats and the
+commands that just read the history start without the scraping code.
+"""
+import os
+import sys
+import json
+from datetime import datetime
+from functools import reduce
+from season_totals import read_json, write_json
+
+HISTORY_DIR = os.sep.join(['results', 'leaderboards'])
+REBASE_DAYS = 30
+KINDS = ["batting", "pitching"]
+
+def history_file(date_str, base=False):
+    """
+    Path of the delta (or base) for a date
+    """
+    if base:
+        return os.sep.join([HISTORY_DIR, f'base_{date_str}.json'])
+    return os.sep.join([HISTORY_DIR, f'{date_str}.json'])
+
+def history_dates():
+    """
+    [base dates, delta dates], each sorted
+    """
+    def hd_inner(names):
+        return [sorted(map(lambda a: a[5:13],
+                           filter(lambda a: a.startswith('base_'), names))),
+                sorted(map(lambda a: a[0:8],
+                           filter(lambda a: a[0].isdigit(), names)))]
+    if not os.path.isdir(HISTORY_DIR):
+        return [[], []]
+    return hd_inner(list(filter(lambda a: a.endswith('.json'),
+                                os.listdir(HISTORY_DIR))))
+
+def empty_snapshot():
+    """
+    Leaderboards with nobody on them
+    """
+    return dict(map(lambda a: [a, {}], KINDS))
+
+def line_delta(old, new):
+    """
+    Fields of new that differ from old ({} when they are the same)
+    """
+    return dict(filter(lambda a: old.get(a[0]) != a[1], new.items()))
+
+def snapshot_delta(old, new):
+    """
+    {kind: {href: changed fields}} taking snapshot old to new (None for
+    players no longer on the leaderboard)
+    """
+    def kind_delta(kind):
+        def player_delta(href):
+            if href not in new[kind]:
+                return [href, None]
+            return [href, line_delta(old[kind].get(href, {}),
+                                     new[kind][href])]
+        return dict(filter(lambda a: a[1] != {}, map(
+            player_delta, set(old[kind]) | set(new[kind]))))
+    return dict(map(lambda a: [a, kind_delta(a)], KINDS))
+
+def apply_delta(snapshot, delta):
+    """
+    Apply a delta to a snapshot (in place)
+    """
+    def apply_kind(kind):
+        def apply_player(href):
+            if delta[kind][href] is None:
+                snapshot[kind].pop(href, None)
+            else:
+                snapshot[kind].setdefault(href, {}).update(
+                    delta[kind][href])
+        list(map(apply_player, delta[kind]))
+    list(map(apply_kind, KINDS))
+    return snapshot
+
+def stats_as_of(date_str=None):
+    """
+    The leaderboards as of date_str (the latest if None): the latest base
+    on or before it plus the deltas after that base.  Returns None if the
+    history starts after date_str.
+    """
+    def sao_inner(bases, deltas):
+        if not bases:
+            return None
+        return reduce(lambda a, b: apply_delta(
+                          a, read_json(history_file(b), {})),
+                      filter(lambda a: bases[-1] < a <= end, deltas),
+                      read_json(history_file(bases[-1], True), {}))
+    end = date_str or '99999999'
+    return sao_inner(*map(lambda a: list(filter(lambda b: b <= end, a)),
+                          history_dates()))
+
+def change_since(since_str, date_str=None):
+    """
+    What changed between the leaderboards as of since_str and as of
+    date_str (the latest if None): {kind: {href: {field: [old, new]}}}.
+    Only players named in the deltas between the two dates are compared.
+    """
+    def cs_inner(old, new, touched):
+        def player_change(kind, href):
+            def field_pair(field):
+                return [field, [old[kind].get(href, {}).get(field),
+                                new[kind].get(href, {}).get(field)]]
+            return dict(filter(lambda a: a[1][0] != a[1][1],
+                               map(field_pair,
+                                   set(old[kind].get(href, {})) |
+                                   set(new[kind].get(href, {})))))
+        def kind_change(kind):
+            return dict(filter(lambda a: a[1], map(
+                lambda a: [a, player_change(kind, a)], touched[kind])))
+        return dict(map(lambda a: [a, kind_change(a)], KINDS))
+    def touched_hrefs():
+        return reduce(lambda a, b: dict(map(
+                          lambda c: [c, a[c] | set(b.get(c, {}))], KINDS)),
+                      map(lambda a: read_json(history_file(a), {}),
+                          filter(lambda a: since_str < a <= end,
+                                 history_dates()[1])),
+                      dict(map(lambda a: [a, set()], KINDS)))
+    end = date_str or '99999999'
+    return cs_inner(stats_as_of(since_str) or empty_snapshot(),
+                    stats_as_of(date_str) or empty_snapshot(),
+                    touched_hrefs())
+
+def refresh(date_str=None, workers=None):
+    """
+    Scrape the leaderboards and record them for date_str (today if None)
+    as a delta, plus a new base when there is no history yet or
+    REBASE_DAYS deltas have built up since the last base.  Raises
+    ValueError if the history already goes past date_str.  Returns the
+    number of players whose lines changed.
+    """
+    # pylint: disable=import-outside-toplevel
+    from cumulative_stats import cumulative_stats
+    def rf_inner(day, bases, deltas):
+        if max(bases + deltas, default=day) > day:
+            raise ValueError(f"leaderboard history already goes past {day}")
+        return record(day, list(filter(lambda a: a < day, bases)),
+                      list(filter(lambda a: a < day, deltas)),
+                      cumulative_stats(workers))
+    def record(day, bases, deltas, new):
+        def prior_deltas():
+            return list(filter(lambda a: bases[-1] < a, deltas))
+        def rc_inner(delta):
+            write_json(history_file(day), delta)
+            if not bases or len(prior_deltas()) >= REBASE_DAYS:
+                write_json(history_file(day, True), new)
+            return sum(map(lambda a: len(delta[a]), KINDS))
+        return rc_inner(snapshot_delta(
+            stats_as_of(max(bases + deltas)) if bases else empty_snapshot(),
+            new))
+    return rf_inner(date_str or datetime.now().strftime("%Y%m%d"),
+                    *history_dates())
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["asof"]:
+        print(json.dumps(stats_as_of(*sys.argv[2:3])))
+    elif sys.argv[1:2] == ["since"]:
+        print(json.dumps(change_since(*sys.argv[2:4]), indent=1))
+    else:
+        print(refresh(*sys.argv[1:2]))
@@ -0,0 +1,179 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Match player names written different ways: boxscore names ("R. Acuna
+Jr.", "a- J. McNeil"), player link slugs ("ronald-acuna-jr") and draft
+sheet names ("Ronald Acuña Jr.", "Acuña Jr., Ronald").
+
+build_name_index turns [name, value] pairs into dictionaries keyed by
+the name as written, by the full name (accents, punctuation, suffixes
+and pinch hitter prefixes removed), by a normalized key (the same with
+the first name cut to an initial) and by a loose key (initial and last
+word only).  Keys shared by two different values map to None so that
+they are never credited to either.
+
+By default only the name as written and the full name are matched.
+With fuzzy set, the initial-only keys are tried too, and then the few
+names that share the name's initial and the Soundex code of its last
+word are compared with it.  Those matches are guesses, meant for
+reports of names that may be spelled differently, not for joins.
+name_resolver wraps an index in a memoized lookup function.
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from functools import reduce
+
+SUFFIXES = ['jr', 'sr', 'ii', 'iii', 'iv']
+PH_PREFIX = re.compile(r'^[a-z]{1,3}-\s+')
+FUZZY_CUTOFF = 0.86
+MAX_CANDIDATES = 25
+SOUNDEX_CODES = dict(
+    [[a, '1'] for a in 'bfpv'] + [[a, '2'] for a in 'cgjkqsxz'] +
+    [[a, '3'] for a in 'dt'] + [['l', '4']] + [[a, '5'] for a in 'mn'] +
+    [['r', '6']])
+
+def plain_text(name):
+    """
+    Lower case name with accents removed
+    """
+    return ''.join(filter(lambda a: not unicodedata.combining(a),
+                          unicodedata.normalize('NFKD', name))).lower()
+
+def name_words(name):
+    """
+    Words of a name in first-last order, without punctuation, suffixes or
+    a pinch hitter prefix
+    """
+    def nw_inner(text):
+        return list(filter(lambda a: a not in SUFFIXES, re.sub(
+            r'[^a-z0-9 ]', ' ', re.sub(r"[.'’]", '', text)).split()))
+    def first_last(text):
+        if ',' in text:
+            return " ".join(reversed(text.split(',', 1)))
+        return text
+    return nw_inner(first_last(PH_PREFIX.sub('', plain_text(name).strip())))
+
+def full_key(name):
+    """
+    Full name key: every word, in first-last order ("ronald acuna")
+    """
+    return " ".join(name_words(name))
+
+def name_key(name):
+    """
+    Normalized key: first initial and the rest of the name ("r acuna")
+    """
+    def nk_inner(words):
+        if len(words) < 2:
+            return " ".join(words)
+        return " ".join([words[0][0]] + words[1:])
+    return nk_inner(name_words(name))
+
+def loose_key(name):
+    """
+    First initial and last word only ("m taylor" for "Michael A. Taylor")
+    """
+    def lk_inner(words):
+        if len(words) < 2:
+            return " ".join(words)
+        return f"{words[0][0]} {words[-1]}"
+    return lk_inner(name_words(name))
+
+def soundex(word):
+    """
+    American Soundex code of a word ("" for an empty word)
+    """
+    def add_code(state, letter):
+        if letter in 'hw':
+            return state
+        code = SOUNDEX_CODES.get(letter, '')
+        if code and code != state[1]:
+            return [state[0] + code, code]
+        return [state[0], code]
+    if not word:
+        return ""
+    return (word[0].upper() + reduce(add_code, word[1:], [
+        '', SOUNDEX_CODES.get(word[0], '')])[0] + '000')[:4]
+
+def sound_key(name):
+    """
+    Bucket for approximate matches: initial and Soundex of the last word
+    """
+    def sk_inner(words):
+        if not words:
+            return ""
+        return f"{words[0][0]} {soundex(words[-1])}"
+    return sk_inner(name_words(name))
+
+def add_key(keys, key, value):
+    """
+    keys[key] = value, or None if key already holds another value
+    """
+    if key in keys and keys[key] != value:
+        keys[key] = None
+    else:
+        keys[key] = value
+    return keys
+
+def build_name_index(pairs):
+    """
+    {'exact', 'full', 'norm', 'loose': {key: value}, 'sound': {bucket:
+    [normalized keys]}} for [name, value] pairs
+    """
+    def add_pair(index, pair):
+        add_key(index['exact'], pair[0], pair[1])
+        add_key(index['full'], full_key(pair[0]), pair[1])
+        add_key(index['norm'], name_key(pair[0]), pair[1])
+        add_key(index['loose'], loose_key(pair[0]), pair[1])
+        bucket = index['sound'].setdefault(sound_key(pair[0]), [])
+        if name_key(pair[0]) not in bucket:
+            bucket.append(name_key(pair[0]))
+        return index
+    return reduce(add_pair, pairs, {'exact': {}, 'full': {}, 'norm': {},
+                                    'loose': {}, 'sound': {}})
+
+def fuzzy_match(index, name):
+    """
+    The value of the closest normalized key in name's Soundex bucket, if
+    it is close enough and unambiguous (None otherwise)
+    """
+    def fm_inner(scored):
+        if not scored or scored[0][0] < FUZZY_CUTOFF:
+            return None
+        if len(scored) > 1 and scored[1][0] == scored[0][0] and \
+                index['norm'][scored[1][1]] != index['norm'][scored[0][1]]:
+            return None
+        return index['norm'][scored[0][1]]
+    return fm_inner(sorted(map(
+        lambda a: [SequenceMatcher(None, name_key(name), a).ratio(), a],
+        index['sound'].get(sound_key(name), [])[:MAX_CANDIDATES]),
+                           reverse=True))
+
+def resolve(index, name, fuzzy=False):
+    """
+    Value for name: exact, then full name key, then (if fuzzy is set)
+    normalized key, loose key and fuzzy match.  None if nothing matches
+    or the match is ambiguous.
+    """
+    if name in index['exact']:
+        return index['exact'][name]
+    if full_key(name) in index['full']:
+        return index['full'][full_key(name)]
+    if not fuzzy:
+        return None
+    if name_key(name) in index['norm']:
+        return index['norm'][name_key(name)]
+    if loose_key(name) in index['loose']:
+        return index['loose'][loose_key(name)]
+    return fuzzy_match(index, name)
+
+def name_resolver(index, fuzzy=False):
+    """
+    Memoized resolve for one index: returns a function of a name
+    """
+    memo = {}
+    def nr_inner(name):
+        if name not in memo:
+            memo[name] = resolve(index, name, fuzzy)
+        return memo[name]
+    return nr_inner
@@ -0,0 +1,112 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Archive of raw boxscore pages, so a season can be reparsed after a parser
+fix without going back to the network.
+
+Pages are saved gzipped as archive/YYYYMMDD/<game id>.html.gz, and
+archive/YYYYMMDD/games.json keeps the day's games in scoreboard order.
+Archiving is on unless SEASON_ARCHIVE is set to off.
+"""
+import os
+import gzip
+import json
+
+ARCHIVE_DIR = os.environ.get("SEASON_ARCHIVE_DIR", "archive")
+_SETTINGS = {"on": os.environ.get("SEASON_ARCHIVE", "on") != "off"}
+
+def set_archive(on):
+    """
+    Turn archiving on or off
+    """
+    _SETTINGS["on"] = on
+
+def archive_on():
+    """
+    True if pages are being archived
+    """
+    return _SETTINGS["on"]
+
+def extract_game_id(url_v):
+    """
+    Game id of a boxscore link, its last path part (as in
+    get_boxscore.extract_team_info)
+    """
+    return list(filter(lambda a: a, url_v.split('/')))[-1]
+
+def game_date(game_id):
+    """
+    YYYYmmdd part of a game id (MLB_20230403_NYM@MIL)
+    """
+    return game_id.split('_')[-2]
+
+def page_file(game_id):
+    """
+    Archive file for a game id
+    """
+    return os.sep.join([ARCHIVE_DIR, game_date(game_id),
+                        f"{game_id}.html.gz"])
+
+def archive_page(url_v, req_text):
+    """
+    Save a boxscore page (replacing an older copy of the same game)
+    """
+    def ap_inner(fname):
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        with gzip.open(fname + '.tmp', 'wt', encoding='utf-8') as outf:
+            outf.write(req_text)
+        os.replace(fname + '.tmp', fname)
+    if _SETTINGS["on"]:
+        ap_inner(page_file(extract_game_id(url_v)))
+    return req_text
+
+def write_manifest(date_str, urls):
+    """
+    Record the day's boxscore links in scoreboard order
+    """
+    if not _SETTINGS["on"]:
+        return
+    os.makedirs(os.sep.join([ARCHIVE_DIR, date_str]), exist_ok=True)
+    with open(os.sep.join([ARCHIVE_DIR, date_str, "games.json"]), 'w',
+              encoding='utf-8') as outf:
+        json.dump(urls, outf)
+
+def archived_games(date_str):
+    """
+    [url, archive file] pairs for a day, in scoreboard order when the
+    manifest exists (otherwise sorted by game id)
+    """
+    def ag_inner(fnames):
+        def from_manifest(urls):
+            return list(filter(lambda a: a[1] in fnames,
+                               map(lambda a: [a, page_file(
+                                   extract_game_id(a))], urls)))
+        if os.path.exists(os.sep.join([ARCHIVE_DIR, date_str,
+                                       "games.json"])):
+            with open(os.sep.join([ARCHIVE_DIR, date_str, "games.json"]),
+                      'r', encoding='utf-8') as inf:
+                return from_manifest(json.load(inf))
+        return list(map(lambda a: [f"/mlb/gametracker/boxscore/{a[:-8]}/",
+                                   os.sep.join([ARCHIVE_DIR, date_str, a])],
+                        sorted(map(os.path.basename, fnames))))
+    if not os.path.isdir(os.sep.join([ARCHIVE_DIR, date_str])):
+        return []
+    return ag_inner(set(map(lambda a: os.sep.join([ARCHIVE_DIR, date_str, a]),
+                            filter(lambda a: a.endswith(".html.gz"),
+                                   os.listdir(os.sep.join([ARCHIVE_DIR,
+                                                           date_str]))))))
+
+def read_archived(fname):
+    """
+    Text of an archived page
+    """
+    with gzip.open(fname, 'rt', encoding='utf-8') as inf:
+        return inf.read()
+
+def archived_dates():
+    """
+    Dates (YYYYmmdd) with archived pages
+    """
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(filter(lambda a: a.isdigit() and len(a) == 8,
+                         os.listdir(ARCHIVE_DIR)))
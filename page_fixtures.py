@@ -0,0 +1,96 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Recorded pages for offline runs (used by bench_pipeline).
+
+A fixture directory holds gzipped pages plus an index.json that maps each
+url to its file.  set_record saves every page downloaded by http_client;
+set_replay serves pages from the fixtures instead of the network.
+"""
+import os
+import gzip
+import json
+import hashlib
+import threading
+from collections import namedtuple
+
+ReplayResponse = namedtuple("ReplayResponse",
+                            ["status_code", "text", "content", "headers"])
+
+_LOCK = threading.Lock()
+_FIXTURES = {"replay": None, "record": None, "index": {}}
+
+def index_file(fixture_dir):
+    """
+    Name of the url -> file index for a fixture directory
+    """
+    return os.sep.join([fixture_dir, "index.json"])
+
+def read_index(fixture_dir):
+    """
+    Load the url -> file index (empty if there is none yet)
+    """
+    if not os.path.exists(index_file(fixture_dir)):
+        return {}
+    with open(index_file(fixture_dir), 'r', encoding='utf-8') as inf:
+        return json.load(inf)
+
+def set_replay(fixture_dir):
+    """
+    Serve pages from fixture_dir (None goes back to the network)
+    """
+    with _LOCK:
+        _FIXTURES.update({"replay": fixture_dir, "record": None,
+                          "index": {} if fixture_dir is None
+                          else read_index(fixture_dir)})
+
+def set_record(fixture_dir):
+    """
+    Save downloaded pages into fixture_dir (None stops recording)
+    """
+    if fixture_dir is not None:
+        os.makedirs(fixture_dir, exist_ok=True)
+    with _LOCK:
+        _FIXTURES.update({"replay": None, "record": fixture_dir,
+                          "index": {} if fixture_dir is None
+                          else read_index(fixture_dir)})
+
+def replay_active():
+    """
+    True if pages are served from fixtures
+    """
+    return _FIXTURES["replay"] is not None
+
+def replay_get(url):
+    """
+    Return a recorded page as a response (404 if it was not recorded)
+    """
+    def rg_inner(fname):
+        if fname is None:
+            return ReplayResponse(404, "", b"", {})
+        with gzip.open(os.sep.join([_FIXTURES["replay"], fname]),
+                       'rb') as inf:
+            return replay_response(inf.read())
+    return rg_inner(_FIXTURES["index"].get(url))
+
+def replay_response(content):
+    """
+    Wrap recorded page bytes as a response
+    """
+    return ReplayResponse(200, content.decode("utf-8"), content, {})
+
+def record_page(url, resp):
+    """
+    Save a successful download when recording
+    """
+    def rp_inner(fixture_dir, fname):
+        with gzip.open(os.sep.join([fixture_dir, fname]), 'wb') as outf:
+            outf.write(resp.text.encode("utf-8"))
+        with _LOCK:
+            _FIXTURES["index"][url] = fname
+            with open(index_file(fixture_dir), 'w',
+                      encoding='utf-8') as outf:
+                json.dump(_FIXTURES["index"], outf, indent=1)
+    if _FIXTURES["record"] is None or resp.status_code != 200:
+        return
+    rp_inner(_FIXTURES["record"],
+             hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html.gz")
@@ -0,0 +1,68 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Run per-item steps (page fetches and parses) across a bounded pool of
+worker threads.
+"""
+import os
+from collections import deque
+from contextlib import closing
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+
+def get_workers(workers=None):
+    """
+    Concurrency limit.  Uses workers if given, otherwise the
+    SEASON_WORKERS environment variable, otherwise DEFAULT_WORKERS.
+    """
+    if workers is None:
+        return int(os.environ.get("SEASON_WORKERS", DEFAULT_WORKERS))
+    return workers
+
+def parallel_map(func, items, workers=None):
+    """
+    Return list(map(func, items)) computed by up to workers threads.
+    Results are in the same order as items.  A limit of 1 runs serially.
+    """
+    def pmap_inner(nworkers):
+        if nworkers <= 1:
+            return list(map(func, items))
+        with ThreadPoolExecutor(max_workers=nworkers) as executor:
+            return list(executor.map(func, items))
+    return pmap_inner(get_workers(workers))
+
+def parallel_imap(func, items, workers=None):
+    """
+    Lazy version of parallel_map.  Results are yielded in order as they
+    are needed and at most workers items are in flight at once, so items
+    may be an endless iterator.
+    """
+    nworkers = get_workers(workers)
+    if nworkers <= 1:
+        yield from map(func, items)
+        return
+    with ThreadPoolExecutor(max_workers=nworkers) as executor:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= nworkers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+def paginate(read_page, workers=None):
+    """
+    Yield the records on pages 1, 2, 3, ... where read_page(pg_no) returns
+    the list of records on a page.  Stops at the first empty page.  Pages
+    are read ahead by up to workers threads.
+    """
+    with closing(parallel_imap(read_page, count(1), workers)) as pages:
+        for records in pages:
+            if not records:
+                return
+            yield from records
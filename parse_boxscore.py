@@ -2,23 +2,23 @@
 """
 Parse a boxscore
 """
-from datetime import datetime
+import time
 import pandas as pd
 from get_boxscore import get_boxscore
-
-def get_game_d(info):
-    """
-    Get date and team abbrev info for this game.
-    """
-    return {'date': datetime.strptime(info[-2],
-                    '%Y%m%d').strftime("%m/%d/%Y"),
-            'teams': info[-1].split('@')}
+from web_pages import cbs_url
+from run_metrics import timed, record_game
+from player_index import game_name_ids, name_id_column, add_players
+from stat_records import concat_lines
+from get_mlb_teams import game_id_info
 
 def get_game_info(date_and_teams):
     """
-    Wraper for get_game_d
+    Get date and team abbrev info for this game (from the memoized
+    boxscore id lookup in get_mlb_teams)
     """
-    return get_game_d(date_and_teams.split("_"))
+    def ggi_inner(info):
+        return {'date': info[0], 'teams': info[1:]}
+    return ggi_inner(game_id_info(date_and_teams))
 
 def gen_pname(nparts):
     """
@@ -32,153 +32,177 @@ def gen_name_and_key(player):
     """
     return [gen_pname(player.split('/')[-2].split('-')), player]
 
-def gen_save_value(txt):
+def bat_names(hitters):
+    """
+    Player names for a column of HITTERS text (pinch hitter prefix such
+    as "a-" and the trailing position removed)
+    """
+    return drop_last_word(hitters.str.replace(r'^[^ ]*- ', '', n=1,
+                                              regex=True))
+
+def drop_last_word(names):
+    """
+    Vectorized " ".join(name.split(" ")[0:-1])
+    """
+    return names.str.replace(r' ?[^ ]*$', '', n=1, regex=True)
+
+def bat_positions(hitters):
     """
-    Record any saves
+    Positions (the last word) for a column of HITTERS text
     """
-    if "(S" in txt:
-        return 1
-    return 0
+    return hitters.str.extract(r'([^ ]*)$', expand=False)
 
-def gen_win_value(txt):
+def pit_names(pitchers):
     """
-    Identify the winnning pitcher
+    Pitcher names for a column of PITCHERS text (without the W/L/S
+    notes)
     """
-    if "(W" in txt:
-        return 1
-    return 0
+    return pitchers.str.replace(r'(?s)\(.*', '', n=1, regex=True).str.strip()
 
-def get_pit_name(name):
+def flag_values(pitchers, flag):
     """
-    Extract the name of the pitcher (without W/L/S info
+    1 for pitchers credited with a win or save (flag is "(W" or "(S"),
+    else 0
     """
-    def get_pit_name2(iname):
-        return iname[0:iname.find('(')].strip()
-    return get_pit_name2(name + ' ')
+    return pitchers.str.contains(flag, regex=False).astype('int64')
 
-def get_bat_pos(name):
+def outs_values(innings):
     """
-    Get the position of the player
+    Convert innings pitched (5.2 means 5 2/3) to outs
     """
-    return name.split(" ")[-1]
+    return (innings * 3).astype('int64') + \
+        ((innings * 10) % 10).round().astype('int64')
 
-def rm_ph_head(name):
+def sb_text_index(raw_data, indx):
     """
-    Remove excess pinch hitter info from the boxscore
+    Index of the BASERUNNING text that applies to batting table indx, or
+    None if nobody in that table is credited with a stolen base
     """
-    if name.split(" ")[0].endswith("-"):
-        return " ".join(name.split(" ")[1:])
-    return name
+    def get_sindx():
+        if len(raw_data['sb_info']) == 1:
+            return 0
+        return indx
+    if len(raw_data['sb_info']) == 0:
+        return None
+    if len(raw_data['sb_info']) == 2:
+        return get_sindx()
+    if indx == 1 and len(raw_data['sb_headers']) == 0:
+        return get_sindx()
+    if indx == 0 and len(raw_data['sb_headers']) != 0:
+        return get_sindx()
+    return None
 
-def get_bat_name(name):
+def sb_counter(sb_text):
     """
-    Piece of code to extract the player name (split from position
+    Return a function giving the stolen bases for a player name in sb_text
+    (the digit after the first mention of the name, 1 if there is none)
     """
-    return " ".join(rm_ph_head(name).split(" ")[0:-1])
+    def sb_after(spot):
+        if spot >= len(sb_text) or not sb_text[spot].isdigit():
+            return 1
+        return int(sb_text[spot])
+    def sb_found(spot, pers):
+        if spot < 0:
+            return 0
+        return sb_after(spot + len(pers))
+    def sb_count(pers):
+        return sb_found(sb_text.find(pers), pers)
+    return sb_count
 
+def bat_steals(raw_data, indx, hitters):
+    """
+    Stolen bases for each batter in table indx.  Each distinct name is
+    looked up once in the stolen base text.
+    """
+    def steals_from(sb_count):
+        def steals_inner(pers):
+            return pers.map(dict(map(lambda a: [a, sb_count(a)],
+                                     pers.unique()))).astype('int64')
+        return steals_inner(drop_last_word(hitters))
+    def bs_inner(sindx):
+        if sindx is None:
+            return pd.Series(0, index=hitters.index, dtype='int64')
+        return steals_from(sb_counter(raw_data['sb_info'][sindx]))
+    return bs_inner(sb_text_index(raw_data, indx))
+
+@timed("transform")
 def do_parse_boxscore(raw_data):
     """
-    Main parser for boxscores.
+    Main parser for boxscores.  Columns are computed with pandas string
+    operations over each table rather than per row.  Each row gets the
+    player ID from the game's player links (see player_index).
     """
-    def pbox_inner(g_info):
-        def add_common(df_porb_plus):
-            def get_porb_data():
-                return df_porb_plus[0].assign(
-                        TEAM=g_info['teams'][df_porb_plus[1]])
-            return get_porb_data().assign(DATE=g_info['date'])
+    def pbox_inner(g_info, name_ids):
+        def with_ids(frame):
+            return name_id_column(frame['NAME'], name_ids)
         def do_bat(indx):
-            def get_bat_sb(name):
-                def get_sindx():
-                    if len(raw_data['sb_info']) == 1:
-                        return 0
-                    return indx
-                def get_pers():
-                    return " ".join(name.split(" ")[:-1])
-                def sb_count(splt):
-                    if len(splt) == 1:
-                        return 0
-                    if len(splt[1]) == 0:
-                        return 1
-                    if not splt[1][0].isdigit():
-                        return 1
-                    return int(splt[1][0])
-                def sb_chk_value():
-                    return sb_count(
-                        raw_data['sb_info'][get_sindx()].split(get_pers()))
-                if len(raw_data['sb_info']) == 0:
-                    return 0
-                if len(raw_data['sb_info']) == 2:
-                    return sb_chk_value()
-                if indx == 1 and len(raw_data['sb_headers']) == 0:
-                    return sb_chk_value()
-                if indx == 0 and len(raw_data['sb_headers']) != 0:
-                    return sb_chk_value()
-                return 0
             def fix_bat(bat_df):
-                def get_batname():
-                    return bat_df.assign(NAME=bat_df['HITTERS'].apply(
-                                    get_bat_name))
-                def top_of_bats(bat1):
-                    def get_pos():
-                        return bat1.assign(POS=bat1['HITTERS'].apply(
-                                            get_bat_pos))
-                    def get_sb(pre_sb):
-                        return pre_sb.assign(SB=bat1['HITTERS'].apply(
-                                            get_bat_sb))
-                    return add_common([get_sb(get_pos()), indx])
-                return top_of_bats(get_batname())
+                return bat_df.assign(
+                    NAME=bat_names(bat_df['HITTERS']),
+                    POS=bat_positions(bat_df['HITTERS']),
+                    SB=bat_steals(raw_data, indx, bat_df['HITTERS']),
+                    TEAM=g_info['teams'][indx], DATE=g_info['date'],
+                    ID=with_ids)
             return fix_bat(raw_data['tables'][indx])
         def get_bat_stats():
             return list(map(do_bat, list(range(0,2))))
         def do_pit(indx):
             def fix_pit(pit_df):
-                def pit1(prev):
-                    return prev.assign(WH=lambda a: a.H + a.BB)
-                def pit2(prev):
-                    return prev.assign(WINS=prev['PITCHERS'].apply(
-                                gen_win_value))
-                def pit3(prev):
-                    return prev.assign(SAVES=prev['PITCHERS'].apply(
-                                gen_save_value))
-                def pit4(prev):
-                    return prev.assign(NAME=prev['PITCHERS'].apply(
-                                get_pit_name))
-                def pit5(prev):
-                    return prev.assign(OUTS=prev['IP'].apply(
-                                lambda a : int(a * 3) + (a * 10) % 10))
-                return add_common([pit1(pit2(pit3(pit4(pit5(pit_df))))),
-                                   indx - 2])
+                return pit_df.assign(
+                    OUTS=outs_values(pit_df['IP']),
+                    NAME=pit_names(pit_df['PITCHERS']),
+                    SAVES=flag_values(pit_df['PITCHERS'], "(S"),
+                    WINS=flag_values(pit_df['PITCHERS'], "(W"),
+                    WH=pit_df['H'] + pit_df['BB'],
+                    TEAM=g_info['teams'][indx - 2], DATE=g_info['date'],
+                    ID=with_ids)
             return fix_pit(raw_data['tables'][indx])
-
         def get_pit_stats():
             return list(map(do_pit, list(range(2,4))))
         return {'bat_stats': get_bat_stats(),
                 'pit_stats': get_pit_stats()}
-    return pbox_inner(get_game_info(raw_data['game_info']))
+    return pbox_inner(get_game_info(raw_data['game_info']),
+                      game_name_ids(raw_data.get('players', [])))
+
+BAT_COLS = ['NAME', 'TEAM', 'DATE', 'POS', 'AB', 'R', 'H', 'RBI', 'HR', 'SB',
+            'ID']
+PIT_COLS = ['NAME', 'TEAM', 'DATE', 'WINS', 'SAVES', 'OUTS', 'ER', 'WH', 'SO',
+            'ID']
 
 def parse_box_main(answer):
     """
-    Return lists of batter and pitcher information
+    Return lists of batter and pitcher information (compact stat lines,
+    see stat_records)
+    """
+    return [concat_lines(answer['bat_stats'], BAT_COLS),
+            concat_lines(answer['pit_stats'], PIT_COLS)]
+
+def record_players(raw_data, box_main):
+    """
+    Add this game's players (ids, names and teams) to the player index
     """
-    return [pd.concat([answer['bat_stats'][0], answer['bat_stats'][1]],
-                        ignore_index=True)[['NAME', 'TEAM', 'DATE', 'POS',
-                        'AB', 'R', 'H', 'RBI', 'HR', 'SB']],
-        pd.concat([answer['pit_stats'][0], answer['pit_stats'][1]],
-                        ignore_index=True)[['NAME', 'TEAM', 'DATE',
-                        'WINS', 'SAVES', 'OUTS', 'ER', 'WH', 'SO']]]
+    add_players(raw_data['players'],
+                pd.concat(box_main)[['ID', 'NAME', 'TEAM']]
+                .to_dict(orient='records'))
+    return box_main
 
-def get_answer(url_v):
+def parse_raw_boxscore(raw_data):
     """
-    Wrapper to add start of http information
+    Parse get_boxscore output and index its players
     """
-    return do_parse_boxscore(get_boxscore(
-                    "https://www.cbssports.com" + url_v))
+    return record_players(raw_data,
+                          parse_box_main(do_parse_boxscore(raw_data)))
 
 def parse_boxscore(url_v):
     """
     Main entry point
     """
-    return parse_box_main(get_answer(url_v))
+    def pb_timed(start):
+        try:
+            return parse_raw_boxscore(get_boxscore(cbs_url(url_v)))
+        finally:
+            record_game(url_v, time.perf_counter() - start)
+    return pb_timed(time.perf_counter())
 
 if __name__ == "__main__":
     print(parse_boxscore("/mlb/gametracker/boxscore/MLB_20230403_NYM@MIL/"))
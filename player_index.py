@@ -0,0 +1,183 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Persistent player index keyed by the numeric cbssports player id.
+
+Player links (boxscore "playerpage" links and /mlb/players/ links on the
+stat pages) end in .../<id>/<first-last>/.  The index maps each id to a
+canonical name, the "F. Last" short form used in boxscores, the name
+variants seen, and the teams the player has appeared for.  It is kept in
+data/player_index.json (see set_index_file) and updated as new ids show
+up; index_version
+counts the updates so that lookups built from the index can tell when
+to rebuild.
+"""
+import os
+import re
+import json
+import threading
+from functools import lru_cache, reduce
+from name_resolver import SUFFIXES, name_key
+from season_totals import write_json
+
+INDEX_FILE = os.sep.join(['data', 'player_index.json'])
+INDEX_LOCK = threading.Lock()
+_STATE = {"file": INDEX_FILE, "version": 0}
+
+def parse_player_href(href):
+    """
+    Return [id, slug] for a player link (None if href is not one)
+    """
+    def pph_inner(found):
+        if found is None:
+            return None
+        return [found.group(1), found.group(2)]
+    return pph_inner(re.search(r'/(\d+)/([a-z0-9-]+)/?$', href))
+
+def fix_part(part):
+    """
+    Capitalize a name part ("jr" becomes "Jr.")
+    """
+    if part in SUFFIXES[:2]:
+        return part.capitalize() + '.'
+    if part in SUFFIXES[2:]:
+        return part.upper()
+    return part.capitalize()
+
+def slug_name(slug):
+    """
+    "aaron-judge" -> "Aaron Judge"
+    """
+    return " ".join(map(fix_part, slug.split('-')))
+
+def slug_variants(slug):
+    """
+    First initial forms of a slug.  "ronald-acuna-jr" gives "R. Acuna"
+    (how find_dup_ids builds names) and "R. Acuna Jr." (full surname).
+    """
+    def sv_inner(parts):
+        if len(parts) < 2:
+            return [slug_name(slug)]
+        return list(dict.fromkeys([
+            parts[0][0].upper() + '. ' + fix_part(parts[1]),
+            parts[0][0].upper() + '. ' + " ".join(map(fix_part,
+                                                      parts[1:]))]))
+    return sv_inner(slug.split('-'))
+
+def game_name_ids(hrefs):
+    """
+    Map the name key (see name_resolver.name_key) of each name variant of
+    the players linked from one game to their id, so that "R. Acuña Jr."
+    finds ronald-acuna-jr.  A key shared by two players in the game maps
+    to None.
+    """
+    def add_variants(name_ids, id_slug):
+        def add_one(key):
+            if name_ids.get(key, id_slug[0]) != id_slug[0]:
+                name_ids[key] = None
+            else:
+                name_ids[key] = id_slug[0]
+        list(map(add_one, set(map(name_key, slug_variants(id_slug[1])))))
+        return name_ids
+    return reduce(add_variants, filter(None, map(parse_player_href, hrefs)),
+                  {})
+
+def name_id_column(names, name_ids):
+    """
+    Player ids for a column of boxscore names ('' when not known)
+    """
+    return names.map(name_key).map(name_ids).fillna('').astype(str)
+
+def set_index_file(fname):
+    """
+    Keep the index in file fname (it is reloaded from there)
+    """
+    with INDEX_LOCK:
+        _STATE["file"] = fname
+        _STATE["version"] += 1
+        get_index.cache_clear()
+
+def index_file():
+    """
+    The file the index is kept in
+    """
+    return _STATE["file"]
+
+@lru_cache(maxsize=1)
+def get_index():
+    """
+    The player index, loaded once ({id: entry})
+    """
+    if not os.path.exists(index_file()):
+        return {}
+    with open(index_file(), 'r', encoding='utf-8') as inf:
+        return json.load(inf)
+
+def index_version():
+    """
+    Number of times the index has changed (or been switched to another
+    file)
+    """
+    return _STATE["version"]
+
+def save_index():
+    """
+    Write the index (via a temporary file and rename)
+    """
+    write_json(index_file(), get_index())
+
+def add_player(pid, slug, name=None, team=None):
+    """
+    Add or extend one entry.  Returns True if anything changed.
+    """
+    def merged(entry):
+        return {'name': entry['name'], 'short': entry['short'],
+                'variants': sorted(set(entry['variants'] +
+                                       slug_variants(slug) +
+                                       ([name] if name else []))),
+                'teams': sorted(set(entry['teams'] +
+                                    ([team] if team else [])))}
+    def ap_inner(old, new):
+        get_index()[pid] = new
+        return old != new
+    return ap_inner(get_index().get(pid),
+                    merged(get_index().get(pid, {
+                        'name': slug_name(slug),
+                        'short': slug_variants(slug)[0],
+                        'variants': [], 'teams': []})))
+
+def add_players(hrefs, rows=()):
+    """
+    Add the players behind a list of player links.  rows (dicts with ID,
+    NAME and TEAM, as parsed from the same page) add the boxscore name and
+    team.  The index is saved if it changed.
+    """
+    def ap_inner(slugs):
+        def save_changes(changes):
+            if any(changes):
+                _STATE["version"] += 1
+                save_index()
+            return any(changes)
+        return save_changes(
+            list(map(lambda a: add_player(a, slugs[a]), slugs)) +
+            list(map(lambda a: add_player(a['ID'], slugs[a['ID']],
+                                          a['NAME'], a['TEAM']),
+                     filter(lambda a: a['ID'] in slugs, rows))))
+    with INDEX_LOCK:
+        return ap_inner(dict(filter(None, map(parse_player_href, hrefs))))
+
+def lookup(pid):
+    """
+    Index entry for an id (None if unknown)
+    """
+    return get_index().get(str(pid))
+
+def name_collisions():
+    """
+    Short names shared by more than one id: {short name: [ids]}
+    """
+    def by_short(groups, pid):
+        groups.setdefault(get_index()[pid]['short'], []).append(pid)
+        return groups
+    with INDEX_LOCK:
+        return dict(filter(lambda a: len(a[1]) > 1,
+                           reduce(by_short, sorted(get_index()), {}).items()))
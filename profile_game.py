@@ -0,0 +1,43 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Profile the fetch and parse of a single game.
+
+Usage: python profile_game.py /mlb/gametracker/boxscore/MLB_20230403_NYM@MIL/
+
+Writes a cProfile dump (results/profile_<game>.prof, readable with
+pstats or snakeviz) and the top tracemalloc allocation sites
+(results/profile_<game>.mem.txt).
+"""
+import os
+import sys
+import cProfile
+import tracemalloc
+from parse_boxscore import parse_boxscore
+from get_boxscore import extract_team_info
+
+TOP_ALLOCATIONS = 30
+
+def profile_game(url_v):
+    """
+    Run parse_boxscore(url_v) under cProfile and tracemalloc; return the
+    names of the two output files
+    """
+    def pg_inner(base, profiler):
+        tracemalloc.start()
+        try:
+            profiler.runcall(parse_boxscore, url_v)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        profiler.dump_stats(base + ".prof")
+        with open(base + ".mem.txt", 'w', encoding='utf-8') as outf:
+            outf.write("\n".join(map(str, snapshot.statistics("lineno")
+                                     [:TOP_ALLOCATIONS])) + "\n")
+        return [base + ".prof", base + ".mem.txt"]
+    os.makedirs('results', exist_ok=True)
+    return pg_inner(os.sep.join(['results', 'profile_' +
+                    extract_team_info(url_v).replace('@', '_')]),
+                    cProfile.Profile())
+
+if __name__ == "__main__":
+    print(profile_game(sys.argv[1]))
@@ -1,56 +1,136 @@
 # Copyright (C) 2023 Warren Usui, MIT License
 """
 Collect draft results, reformat
+
+The draft sheet is streamed with openpyxl in read-only mode and the
+non-player rows are dropped with vectorized masks.  ingest_draft writes
+the rosters, the name -> manager index (see roster_index) and its
+name_resolver index as one json file that scoring loads directly;
+ingest_drafts does the same for many leagues' draft files at once.
 """
 import os
+import sys
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+from openpyxl import load_workbook
+from season_totals import write_json
+from name_resolver import build_name_index
+from roster_index import build_roster_index, roster_names, INDEX_FILE, \
+    RAW_DRAFT
+
+ROSTER_DIR = os.sep.join(["data", "rosters"])
+HEADER_ROW = 1
+MANAGER_COLS = 3
+
+def read_draft_rows(xlsx_file):
+    """
+    Stream the draft sheet: [header, rows] with the rows below the
+    header row as tuples of cell values
+    """
+    def rdr_inner(rows):
+        return [next(rows), list(rows)]
+    workbook = load_workbook(xlsx_file, read_only=True, data_only=True)
+    try:
+        return rdr_inner(islice(workbook.active.iter_rows(values_only=True),
+                                HEADER_ROW, None))
+    finally:
+        workbook.close()
+
+def player_rows(positions):
+    """
+    Mask of the rows whose first column is a player position (not blank,
+    not a number, not "x" and not a "Max..." or "Slots..." line).  The
+    column may hold no strings at all (all blank or all numbers).
+    """
+    def pr_inner(is_text):
+        return is_text & positions.ne('x') & \
+            ~positions.where(is_text, '').astype(str).str.startswith(
+                ("Max", "Slots"))
+    return pr_inner(positions.map(lambda a: isinstance(a, str)))
+
+def make_table(header_and_rows):
+    """
+    DataFrame of the player rows: a Position column and one column of
+    player names per manager (the first column of each manager's block,
+    for every block with a manager named in the header row)
+    """
+    def mt_inner(frame):
+        return frame[player_rows(frame['Position'])].reset_index(drop=True)
+    def cell(row, col):
+        return row[col] if col < len(row) else None
+    def mt_cols(header, cols):
+        return mt_inner(pd.DataFrame.from_records(
+            list(map(lambda a: [a[0]] + list(map(lambda b: cell(a, b),
+                                                  cols)),
+                     header_and_rows[1])),
+            columns=['Position'] + list(map(lambda a: header[a], cols))
+        ).astype(object))
+    return mt_cols(header_and_rows[0], list(filter(
+        lambda a: isinstance(header_and_rows[0][a], str) and
+        header_and_rows[0][a].strip(),
+        range(1, len(header_and_rows[0]), MANAGER_COLS))))
 
-def dotrim_rows(plyr_row):
+def rosters(table):
     """
-    Return False if we do not want to save this row because the value of the
-    first column is not a player position.
+    {manager: [[position, player], ...]} (empty slots left out)
     """
-    if isinstance(plyr_row[1][0], float):
-        return False
-    if plyr_row[1][0] == 'x':
-        return False
-    if plyr_row[1][0].startswith("Max") or plyr_row[1][0].startswith("Slots"):
-        return False
-    return True
+    def roster(manager):
+        return list(map(list, filter(
+            lambda a: isinstance(a[1], str) and a[1].strip(),
+            zip(table['Position'], table[manager]))))
+    return dict(map(lambda a: [a, roster(a)], table.columns[1:]))
 
-def reformat_rows(league):
+def save_rosters(table, league, out_file):
     """
-    Filter out rows that are invalid.
+    Save a draft table's rosters, roster index and the name index of the
+    drafted names (see name_resolver) as json ({'league', 'managers',
+    'rosters', 'players', 'names'})
     """
-    return list(map(lambda a: a[1], list(filter(dotrim_rows,
-                                                league.iterrows()))))
+    write_json(out_file, {'league': league,
+                          'managers': list(table.columns[1:]),
+                          'rosters': rosters(table),
+                          'players': build_roster_index(table),
+                          'names': build_name_index(roster_names(table))})
+    return out_file
 
-def read_start_of_season():
+def ingest_draft(xlsx_file=RAW_DRAFT, out_file=INDEX_FILE):
     """
-    Get the original draft page.
+    Read a draft sheet and save its rosters and roster index
     """
-    return pd.read_excel(os.sep.join(["data", "draft.xlsx"]), header=1)
+    return save_rosters(make_table(read_draft_rows(xlsx_file)),
+                        os.path.splitext(os.path.basename(xlsx_file))[0],
+                        out_file)
 
-def make_table():
+def league_file(xlsx_file, out_dir=ROSTER_DIR):
     """
-    Return DataFrame with invalid rows filtered and Position column named.
+    Roster file for a league's draft sheet (named after the sheet)
     """
-    return pd.DataFrame(reformat_rows(read_start_of_season())).rename(
-                    columns={'Unnamed: 0': 'Position'}).reset_index()
+    return os.sep.join([out_dir, os.path.splitext(
+        os.path.basename(xlsx_file))[0] + '.json'])
 
-def fix_columns(old_df):
+def ingest_drafts(xlsx_files, out_dir=ROSTER_DIR, processes=None):
     """
-    Columns for the new DataFrame are Position and Manager names.
+    Ingest many leagues' draft sheets (across a process pool) into
+    out_dir/<sheet name>.json.  Returns the files written.
     """
-    return old_df[['Position'] + list(map(lambda a: old_df.columns[2:][a],
-                                  range(0, 3 * 10 - 1, 3)))]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(ingest_draft, xlsx_files,
+                                 map(lambda a: league_file(a, out_dir),
+                                     xlsx_files)))
 
 def get_cleaner_xlsx(xlsx_file):
     """
-    Write new excel file with data reformatted
+    Write new excel file with data reformatted (and the roster index
+    that scoring reads)
     """
-    fix_columns(make_table()).to_excel(os.sep.join(['data', xlsx_file]),
-                                       index=False)
+    def gcx_inner(table):
+        table.to_excel(os.sep.join(['data', xlsx_file]), index=False)
+        save_rosters(table, "draft", INDEX_FILE)
+    gcx_inner(make_table(read_draft_rows(RAW_DRAFT)))
 
 if __name__ == "__main__":
-    get_cleaner_xlsx("formatted_draft.xlsx")
+    if sys.argv[1:]:
+        print(ingest_drafts(sys.argv[1:]))
+    else:
+        get_cleaner_xlsx("formatted_draft.xlsx")
@@ -0,0 +1,62 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Rebuild daily results from archived boxscore pages (no network).
+
+Usage: python reprocess.py [START END [PROCESSES]]   (dates in YYYYmmdd)
+
+Archived pages (see page_archive) for the whole range are parsed across
+a process pool with the current get_scrape_info/get_tables/
+do_parse_boxscore code.  Each day's results are rewritten through
+update_day_records.save_games one game at a time as they are parsed.
+With no dates every archived day is reprocessed.
+"""
+import os
+import sys
+from itertools import chain, groupby
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from get_boxscore import boxscore_from_text
+from parse_boxscore import do_parse_boxscore, parse_box_main
+from parse_boxscore import record_players
+from page_archive import archived_dates, archived_games, read_archived
+from update_day_records import save_games
+from web_pages import cbs_url
+
+def parse_archived(game):
+    """
+    Parse one archived page (runs in a worker process).  game is
+    [date, url, archive file]; returns [date, player links, frames].
+    """
+    def pa_inner(raw_data):
+        return [game[0], raw_data['players'],
+                parse_box_main(do_parse_boxscore(raw_data))]
+    return pa_inner(boxscore_from_text(cbs_url(game[1]),
+                                       read_archived(game[2])))
+
+def reprocess(start=None, end=None, processes=None):
+    """
+    Reparse the archived days from start to end (YYYYmmdd strings, None
+    for no limit) and rewrite their results.  Returns the dates done.
+    """
+    def in_range(date_str):
+        return (start is None or date_str >= start) and \
+            (end is None or date_str <= end)
+    def season_games():
+        return list(chain.from_iterable(map(
+            lambda a: map(lambda b: [a] + b, archived_games(a)),
+            filter(in_range, archived_dates()))))
+    def game_frames(parsed):
+        record_players({'players': parsed[1]}, parsed[2])
+        return parsed[2]
+    def save_day(date_and_parsed):
+        save_games(datetime.strptime(date_and_parsed[0], "%Y%m%d"),
+                   map(game_frames, date_and_parsed[1]))
+        return date_and_parsed[0]
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as \
+            executor:
+        return list(map(save_day, groupby(executor.map(
+            parse_archived, season_games(), chunksize=4),
+                                          key=lambda a: a[0])))
+
+if __name__ == "__main__":
+    print(reprocess(*sys.argv[1:3], *map(int, sys.argv[3:4])))
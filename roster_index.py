@@ -0,0 +1,51 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+The drafted name -> manager index built from a draft table (a Position
+column and one column of player names per manager).  Shared by
+reformat_start_of_season, which writes it, and standings, which scores
+with it.
+"""
+import os
+from functools import reduce
+from itertools import chain
+
+RAW_DRAFT = os.sep.join(['data', 'draft.xlsx'])
+INDEX_FILE = os.sep.join(['data', 'roster_index.json'])
+
+def draft_key(name):
+    """
+    Convert a draft sheet name ("Aaron Judge" or "Judge, Aaron") to the
+    first initial and last name form used in the boxscores ("A. Judge")
+    """
+    def dk_inner(parts):
+        if len(parts) < 2:
+            return " ".join(parts)
+        return ''.join([parts[0][0], '. ', " ".join(parts[1:])])
+    if ',' in name:
+        return dk_inner(" ".join(reversed(list(map(
+            str.strip, name.split(',', 1))))).split())
+    return dk_inner(name.split())
+
+def roster_names(draft_df):
+    """
+    [drafted name, manager] for every player on the draft sheet, with
+    the names as drafted
+    """
+    return list(chain.from_iterable(map(
+        lambda a: list(map(lambda b: [b, a], filter(
+            lambda b: isinstance(b, str) and b.strip(), draft_df[a]))),
+        draft_df.columns[1:])))
+
+def build_roster_index(draft_df):
+    """
+    Map each drafted player's name key to a manager.  Keys drafted by
+    more than one manager map to None (they cannot be credited).
+    """
+    def add_manager(index, pair):
+        if pair[0] in index and index[pair[0]] != pair[1]:
+            index[pair[0]] = None
+        else:
+            index[pair[0]] = pair[1]
+        return index
+    return reduce(add_manager, map(lambda a: [draft_key(a[0]), a[1]],
+                                   roster_names(draft_df)), {})
@@ -0,0 +1,120 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Opt-in instrumentation for the ingest pipeline.
+
+Turn it on with enable() or by setting SEASON_METRICS=1.  Functions
+wrapped with @timed(stage) then record their call count and wall time,
+counters (cache hits and so on) are kept with count(), and per-game parse
+times with record_game().  write_report() saves everything, together with
+the request and byte totals from http_client, as a json run report.
+When metrics are off the wrappers only check a flag.
+"""
+import os
+import json
+import time
+import threading
+from functools import wraps
+from datetime import datetime
+from http_client import request_counts, reset_counts
+
+_LOCK = threading.Lock()
+_STATE = {"enabled": os.environ.get("SEASON_METRICS", "") not in ("", "0"),
+          "started": time.time(), "stages": {}, "counters": {}, "games": {}}
+
+def enable(on=True):
+    """
+    Turn metrics on (or off) and start a fresh report
+    """
+    _STATE["enabled"] = on
+    reset()
+
+def enabled():
+    """
+    True if metrics are being recorded
+    """
+    return _STATE["enabled"]
+
+def reset():
+    """
+    Clear everything recorded so far
+    """
+    with _LOCK:
+        _STATE.update({"started": time.time(), "stages": {},
+                       "counters": {}, "games": {}})
+    reset_counts()
+
+def add_time(stage, seconds):
+    """
+    Record one call of stage taking seconds
+    """
+    with _LOCK:
+        def at_inner(entry):
+            _STATE["stages"][stage] = {
+                "calls": entry["calls"] + 1,
+                "seconds": entry["seconds"] + seconds,
+                "max_seconds": max(entry["max_seconds"], seconds)}
+        at_inner(_STATE["stages"].get(stage, {"calls": 0, "seconds": 0.0,
+                                              "max_seconds": 0.0}))
+
+def count(counter, amount=1):
+    """
+    Add amount to a named counter
+    """
+    if not _STATE["enabled"]:
+        return
+    with _LOCK:
+        _STATE["counters"][counter] = \
+            _STATE["counters"].get(counter, 0) + amount
+
+def record_game(game, seconds):
+    """
+    Record the parse time of one game
+    """
+    if not _STATE["enabled"]:
+        return
+    with _LOCK:
+        _STATE["games"][game] = seconds
+
+def timed(stage):
+    """
+    Decorator recording the wall time of each call under stage
+    """
+    def timed_func(func):
+        @wraps(func)
+        def timed_inner(*args, **kwargs):
+            if not _STATE["enabled"]:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(stage, time.perf_counter() - start)
+        return timed_inner
+    return timed_func
+
+def report(extra=None):
+    """
+    The run report as a dict.  Stage seconds are summed over all calls
+    (calls made in parallel threads overlap).
+    """
+    with _LOCK:
+        return dict({"run_at": datetime.now().isoformat(),
+                     "wall_seconds": time.time() - _STATE["started"],
+                     "http": request_counts(),
+                     "stages": dict(_STATE["stages"]),
+                     "counters": dict(_STATE["counters"]),
+                     "games": dict(_STATE["games"])}, **(extra or {}))
+
+def write_report(fname=None, extra=None):
+    """
+    Save the run report (default results/run_report_YYYYmmdd_HHMMSS.json)
+    """
+    def wr_inner(out_name):
+        os.makedirs(os.path.dirname(out_name) or '.', exist_ok=True)
+        with open(out_name, 'w', encoding='utf-8') as outf:
+            json.dump(report(extra), outf, indent=1)
+        return out_name
+    if fname is None:
+        return wr_inner(os.sep.join(['results', 'run_report_' +
+                        f'{datetime.now().strftime("%Y%m%d_%H%M%S")}.json']))
+    return wr_inner(fname)
@@ -0,0 +1,230 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Command line entry point for the season scripts.
+
+    python season.py daily [--date YYYYmmdd] [--metrics]
+    python season.py backfill START END [--force] [--day-workers N]
+    python season.py reprocess [START END] [--processes N]
+    python season.py games [YYYYmmdd]
+    python season.py standings [--near-misses YYYYmmdd]
+    python season.py teams [--force]
+    python season.py draft [DRAFT.xlsx ...]
+    python season.py dups
+    python season.py cumulative [--history]
+    python season.py leaders [--as-of YYYYmmdd] [--since YYYYmmdd]
+    python season.py query QUERY          (see season_query)
+    python season.py serve [--port PORT]
+    python season.py watch [--poll SECONDS]
+    python season.py profile BOXSCORE_URL
+    python season.py startup [--repeat N]
+
+--workers N (before the command) sets the number of concurrent fetches.
+Only this module and argparse are loaded at start.  Each command
+imports the modules it needs when it runs, so cheap commands never pay
+for pandas (and commands served from the page cache never load
+requests).
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from datetime import timedelta
+from importlib import import_module
+
+def call(module, func, *args):
+    """
+    Import module and run its func(*args)
+    """
+    return getattr(import_module(module), func)(*args)
+
+def yesterday():
+    """
+    Yesterday's date as a YYYYmmdd string
+    """
+    return (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+
+def run_daily(args):
+    """
+    Fetch, parse and save one day's games (yesterday by default)
+    """
+    if args.metrics:
+        call("run_metrics", "enable")
+    call("update_day_records", "update_day_records", args.workers,
+         datetime.strptime(args.date or yesterday(), "%Y%m%d"))
+
+def run_backfill(args):
+    """
+    Fill in results for a range of days
+    """
+    print(call("backfill", "backfill", args.start, args.end, args.force,
+               args.day_workers, args.workers))
+
+def run_reprocess(args):
+    """
+    Rebuild results from archived boxscore pages
+    """
+    print(call("reprocess", "reprocess", args.start, args.end,
+               args.processes))
+
+def run_games(args):
+    """
+    List the boxscores of the games played on a date
+    """
+    print("\n".join(call("find_games_given_date", "find_games_given_date",
+                         args.date or yesterday(), args.workers)))
+
+def run_standings(args):
+    """
+    Print the current standings (or a day's lines that were credited to
+    nobody but look like drafted players)
+    """
+    def rs_inner(standings):
+        if args.near_misses:
+            return standings.near_misses(standings.read_json(os.sep.join(
+                ['results', f'{args.near_misses}.json']), {}))
+        return standings.read_json(standings.STANDINGS_FILE, {}).get(
+            'standings', [])
+    print(json.dumps(rs_inner(import_module("standings")), indent=1))
+
+def run_teams(args):
+    """
+    Refresh the team metadata (if stale, or with --force) and save the
+    team name and abbreviation files
+    """
+    call("get_mlb_teams", "save_mlb_teams", args.force)
+
+def run_draft(args):
+    """
+    Reformat the draft spreadsheet (or ingest many leagues' sheets)
+    """
+    if args.files:
+        print(call("reformat_start_of_season", "ingest_drafts", args.files))
+    else:
+        call("reformat_start_of_season", "get_cleaner_xlsx",
+             "formatted_draft.xlsx")
+
+def run_dups(_):
+    """
+    Print players whose short names collide
+    """
+    print(call("find_dup_ids", "indexed_dup_ids"))
+
+def run_cumulative(args):
+    """
+    Save the season-to-date stats pages (or add them to the leaderboard
+    history)
+    """
+    if args.history:
+        print(call("leaderboard_history", "refresh", None, args.workers))
+    else:
+        call("cumulative_stats", "stash_result")
+
+def run_leaders(args):
+    """
+    Print the leaderboards as of a date, or what changed since a date
+    """
+    if args.since:
+        print(json.dumps(call("leaderboard_history", "change_since",
+                              args.since, args.as_of), indent=1))
+    else:
+        print(json.dumps(call("leaderboard_history", "stats_as_of",
+                              args.as_of)))
+
+def run_query(args):
+    """
+    Answer one query over the daily records
+    """
+    print(json.dumps(call("season_query", "run_query", args.query),
+                     indent=1))
+
+def run_serve(args):
+    """
+    Answer queries over HTTP
+    """
+    call("season_query", "serve", args.port)
+
+def run_watch(args):
+    """
+    Print stat changes in today's games as they happen
+    """
+    call("watch_games", "watch", *filter(None, [args.poll]))
+
+def run_profile(args):
+    """
+    Profile parsing one boxscore
+    """
+    print(call("profile_game", "profile_game", args.url))
+
+def run_startup(args):
+    """
+    Time cold starts of the commands
+    """
+    print(json.dumps(call("bench_startup", "bench_startup", args.repeat),
+                     indent=1))
+
+def add_dates(parser, required):
+    """
+    START and END date arguments (YYYYmmdd)
+    """
+    parser.add_argument("start", nargs=None if required else "?")
+    parser.add_argument("end", nargs=None if required else "?")
+
+def get_parser():
+    """
+    The argument parser, one subcommand per script
+    """
+    def add_cmd(name, func, help_text):
+        cmd = subs.add_parser(name, help=help_text)
+        cmd.set_defaults(func=func)
+        return cmd
+    parser = argparse.ArgumentParser(prog="season")
+    parser.add_argument("--workers", type=int, default=None)
+    subs = parser.add_subparsers(dest="command", required=True)
+    daily = add_cmd("daily", run_daily, "save one day's results")
+    daily.add_argument("--date")
+    daily.add_argument("--metrics", action="store_true")
+    backfill = add_cmd("backfill", run_backfill, "save a range of days")
+    add_dates(backfill, True)
+    backfill.add_argument("--force", action="store_true")
+    backfill.add_argument("--day-workers", type=int, default=2)
+    reprocess = add_cmd("reprocess", run_reprocess,
+                        "rebuild results from archived pages")
+    add_dates(reprocess, False)
+    reprocess.add_argument("--processes", type=int, default=None)
+    add_cmd("games", run_games, "list a day's boxscores").add_argument(
+        "date", nargs="?")
+    add_cmd("standings", run_standings, "print the standings") \
+        .add_argument("--near-misses")
+    add_cmd("teams", run_teams, "save team names and abbreviations") \
+        .add_argument("--force", action="store_true")
+    add_cmd("draft", run_draft, "reformat the draft spreadsheet") \
+        .add_argument("files", nargs="*")
+    add_cmd("dups", run_dups, "list colliding player names")
+    add_cmd("cumulative", run_cumulative,
+            "save season-to-date stats").add_argument(
+                "--history", action="store_true")
+    leaders = add_cmd("leaders", run_leaders, "query leaderboard history")
+    leaders.add_argument("--as-of")
+    leaders.add_argument("--since")
+    add_cmd("query", run_query, "query the daily records").add_argument(
+        "query")
+    add_cmd("serve", run_serve, "serve queries over HTTP").add_argument(
+        "--port", type=int, default=8023)
+    add_cmd("watch", run_watch, "follow today's games").add_argument(
+        "--poll", type=int, default=None)
+    add_cmd("profile", run_profile, "profile one boxscore").add_argument(
+        "url")
+    add_cmd("startup", run_startup, "time command cold starts").add_argument(
+        "--repeat", type=int, default=3)
+    return parser
+
+def main(argv=None):
+    """
+    Parse the command line and run the command
+    """
+    args = get_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
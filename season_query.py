@@ -0,0 +1,375 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Queries over the daily records (results/YYYYMMDD.json).
+
+The records are held in memory with indexes by player (ID and name),
+by team and by date.  Before each query the results directory is
+checked, and only the days whose files are new or have changed since
+they were indexed are (re)read, so a long-running process picks up each
+day as update_day_records writes it.
+
+    python season_query.py QUERY
+    python season_query.py serve [PORT]
+
+where QUERY is one of
+
+    /player/<name or id>?start=YYYYmmdd&end=YYYYmmdd
+    /team/<team abbreviation or name>?kind=pitchers&days=7
+    /leaders?kind=batters&stat=SB&start=20230501&count=10
+
+serve answers the same queries as json over HTTP on localhost.
+"""
+import os
+import re
+import sys
+import json
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from datetime import datetime
+from datetime import timedelta
+from functools import lru_cache, reduce
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from season_totals import STATS, player_key, new_entry
+from get_mlb_teams import team_abbrev, require_teams
+
+RESULTS_DIR = 'results'
+DAY_FILE = re.compile(r'^(\d{8})\.json$')
+QUERY_LOCK = threading.RLock()
+SERVE_PORT = 8023
+
+def empty_index():
+    """
+    An index with no days in it
+    """
+    def per_kind():
+        return dict(map(lambda a: [a, {}], STATS))
+    return {'mtimes': {}, 'days': {}, 'player': per_kind(),
+            'team': per_kind(), 'series': per_kind()}
+
+def row_keys(row):
+    """
+    The player index keys for a row (ID and name)
+    """
+    return set(filter(None, [row.get('ID'), row['NAME']]))
+
+def line_values(kind, row):
+    """
+    [games, stats...] for one row
+    """
+    return [1] + list(map(lambda a: row[a], STATS[kind]))
+
+def add_values(left, right, sign=1):
+    """
+    Elementwise left + sign * right
+    """
+    return list(map(lambda a: a[0] + sign * a[1], zip(left, right)))
+
+def rebuild_series(series):
+    """
+    Recompute a player's running totals from its per-day lines
+    """
+    series['days'] = sorted(series['lines'])
+    series['cum'] = list(accumulate(map(lambda a: series['lines'][a],
+                                        series['days']), add_values))
+
+def add_to_series(index, kind, day, row):
+    """
+    Add a row to its player's per-day lines and running totals.  Rows
+    for a day after the player's last day (the usual case, a new day)
+    just extend the totals.
+    """
+    def ats_inner(series, values):
+        series['lines'][day] = add_values(
+            series['lines'].get(day, [0] * len(values)), values)
+        if series['days'] and series['days'][-1] == day:
+            series['cum'][-1] = add_values(series['cum'][-1], values)
+        elif not series['days'] or series['days'][-1] < day:
+            series['days'].append(day)
+            series['cum'].append(add_values(
+                series['cum'][-1] if series['cum'] else
+                [0] * len(values), values))
+        else:
+            rebuild_series(series)
+    ats_inner(index['series'][kind].setdefault(player_key(row), {
+        'entry': new_entry(kind, row), 'lines': {}, 'days': [],
+        'cum': []}), line_values(kind, row))
+
+def drop_from_series(index, kind, day, row):
+    """
+    Remove a day from a row's player series
+    """
+    def dfs_inner(series):
+        if series['lines'].pop(day, None) is not None:
+            rebuild_series(series)
+        if not series['days']:
+            del index['series'][kind][player_key(row)]
+    dfs_inner(index['series'][kind][player_key(row)])
+
+def index_rows(index, day, sign):
+    """
+    Add (sign 1) or remove (sign -1) a day's rows in the player, team
+    and running total indexes.  The player and team indexes map a key to
+    {day: [row positions]}.
+    """
+    def index_row(kind, pos, row):
+        def update(keys, key):
+            if sign > 0:
+                keys.setdefault(key, {}).setdefault(day, []).append(pos)
+            elif keys.get(key, {}).pop(day, None) is not None and \
+                    not keys[key]:
+                del keys[key]
+        list(map(lambda a: update(index['player'][kind], a),
+                 row_keys(row)))
+        update(index['team'][kind], row['TEAM'])
+        if sign > 0:
+            add_to_series(index, kind, day, row)
+        elif player_key(row) in index['series'][kind]:
+            drop_from_series(index, kind, day, row)
+    list(map(lambda a: list(map(lambda b: index_row(a, *b), enumerate(
+        index['days'][day][a]))), STATS))
+
+def drop_day(index, day):
+    """
+    Remove a day from the index
+    """
+    if day in index['days']:
+        index_rows(index, day, -1)
+        del index['days'][day]
+        del index['mtimes'][day]
+
+def add_day(index, day, mtime):
+    """
+    Read a day's records into the index
+    """
+    with open(os.sep.join([RESULTS_DIR, f'{day}.json']), 'r',
+              encoding='utf-8') as inf:
+        index['days'][day] = json.load(inf)
+    index['mtimes'][day] = mtime
+    index_rows(index, day, 1)
+
+def day_files():
+    """
+    {day: modification time} for the records in RESULTS_DIR
+    """
+    def df_inner(names):
+        return dict(map(lambda a: [DAY_FILE.match(a).group(1),
+                                   os.stat(os.sep.join([RESULTS_DIR, a]))
+                                   .st_mtime_ns],
+                        filter(DAY_FILE.match, names)))
+    if not os.path.isdir(RESULTS_DIR):
+        return {}
+    return df_inner(os.listdir(RESULTS_DIR))
+
+def sync_index(index):
+    """
+    Bring the index up to date with RESULTS_DIR, reading only the days
+    that were added or rewritten since the last sync
+    """
+    def si_inner(files):
+        def refresh(day):
+            drop_day(index, day)
+            add_day(index, day, files[day])
+        list(map(lambda a: drop_day(index, a),
+                 set(index['days']) - set(files)))
+        list(map(refresh, sorted(filter(
+            lambda a: index['mtimes'].get(a) != files[a], files))))
+        return index
+    with QUERY_LOCK:
+        return si_inner(day_files())
+
+@lru_cache(maxsize=1)
+def get_index():
+    """
+    The index shared by all queries in this process
+    """
+    return empty_index()
+
+def current_index():
+    """
+    The shared index, synced with RESULTS_DIR
+    """
+    return sync_index(get_index())
+
+def in_window(day, start, end):
+    """
+    True if start <= day <= end (YYYYmmdd strings, either may be None)
+    """
+    return (start is None or day >= start) and (end is None or day <= end)
+
+def last_days(ndays, end=None):
+    """
+    [start, end] covering ndays days up to end (the latest indexed day
+    if None)
+    """
+    def ld_inner(end_day):
+        if end_day is None:
+            return [None, None]
+        return [(datetime.strptime(end_day, "%Y%m%d") -
+                 timedelta(days=ndays - 1)).strftime("%Y%m%d"), end_day]
+    return ld_inner(end or max(current_index()['days'], default=None))
+
+def indexed_rows(index, kind, positions, start, end):
+    """
+    The rows of kind at positions ({day: [row positions]}) from start to
+    end, in date order
+    """
+    return [index['days'][day][kind][pos] for day in sorted(positions)
+            if in_window(day, start, end) for pos in positions[day]]
+
+def player_games(player, start=None, end=None):
+    """
+    Every stat line of a player (ID or short name) from start to end:
+    {'batters': [rows], 'pitchers': [rows]}
+    """
+    def pg_inner(index):
+        return dict(map(lambda a: [a, indexed_rows(
+            index, a, index['player'][a].get(player, {}), start, end)],
+                        STATS))
+    return pg_inner(current_index())
+
+def team_lines(team, kind, start=None, end=None):
+    """
+    A team's batter or pitcher lines from start to end
+    """
+    def tl_inner(index):
+        return indexed_rows(index, kind, index['team'][kind].get(team, {}),
+                            start, end)
+    return tl_inner(current_index())
+
+def window_total(series, start, end):
+    """
+    A player's [games, stats...] from start to end, from the running
+    totals (two bisections)
+    """
+    def wt_inner(first, last):
+        if last < 0 or last < first:
+            return [0] * len(series['cum'][0])
+        if first == 0:
+            return series['cum'][last]
+        return add_values(series['cum'][last], series['cum'][first - 1], -1)
+    return wt_inner(0 if start is None else
+                    bisect_left(series['days'], start),
+                    len(series['days']) - 1 if end is None else
+                    bisect_right(series['days'], end) - 1)
+
+def team_totals(index, kind, team, start, end):
+    """
+    [entry, [games, stats...]] per player from a team's lines
+    """
+    def add_row(totals, row):
+        totals.setdefault(player_key(row), [new_entry(kind, row), [0] * (
+            len(STATS[kind]) + 1)])
+        totals[player_key(row)][1] = add_values(
+            totals[player_key(row)][1], line_values(kind, row))
+        return totals
+    return reduce(add_row, indexed_rows(
+        index, kind, index['team'][kind].get(team, {}), start, end),
+                  {}).values()
+
+# pylint: disable-next=too-many-arguments
+def leaders(kind, stat, start=None, end=None, *, count=10, team=None):
+    """
+    The count players with the highest total of stat from start to end
+    (optionally only lines for team).  Each entry has the player's ID,
+    NAME, TEAM, games and the stat total.
+    """
+    def ld_inner(index):
+        def totals():
+            if team is not None:
+                return team_totals(index, kind, team, start, end)
+            return map(lambda a: [a['entry'], window_total(a, start, end)],
+                       index['series'][kind].values())
+        def make_line(total):
+            return {'ID': total[0]['ID'], 'NAME': total[0]['NAME'],
+                    'TEAM': total[0]['TEAM'], 'G': total[1][0],
+                    stat: total[1][col]}
+        return list(map(make_line, heapq.nlargest(
+            count, filter(lambda a: a[1][0] > 0, totals()),
+            key=lambda a: a[1][col])))
+    if stat not in STATS[kind]:
+        raise ValueError(f"{stat} is not a {kind} stat")
+    col = STATS[kind].index(stat) + 1
+    return ld_inner(current_index())
+
+def run_query(query_url):
+    """
+    Run a query given as a url path (see above)
+    """
+    def rq_inner(url):
+        with QUERY_LOCK:
+            return answer(url.path, parse_qs(url.query))
+    return rq_inner(urlsplit(query_url))
+
+def answer(path, query):
+    """
+    Run the query for a url path and its query parameters (None if there
+    is no such query).  A team given by an abbreviation found in the
+    records is used as is.  Other team names are looked up in the saved
+    team metadata only (ValueError if there is none); queries never
+    scrape.
+    """
+    def param(name, default=None):
+        return query.get(name, [default])[0]
+    def window():
+        if param('days'):
+            return last_days(int(param('days')), param('end'))
+        return [param('start'), param('end')]
+    def team_param(team):
+        if any(map(lambda a: team.upper() in current_index()['team'][a],
+                   STATS)):
+            return team.upper()
+        require_teams()
+        return team_abbrev(team)
+    parts = list(filter(None, map(unquote, path.split('/'))))
+    if parts[0:1] == ['player'] and len(parts) == 2:
+        return player_games(parts[1], *window())
+    if parts[0:1] == ['team'] and len(parts) == 2:
+        return team_lines(team_param(parts[1]), param('kind', 'batters'),
+                          *window())
+    if parts == ['leaders']:
+        return leaders(param('kind', 'batters'), param('stat'), *window(),
+                       count=int(param('count', 10)),
+                       team=param('team') and team_param(param('team')))
+    return None
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    GET handler for the query endpoint (see answer)
+    """
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Reply with the query result as json
+        """
+        def send(status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        try:
+            result = run_query(self.path)
+        except (KeyError, ValueError, TypeError) as err:
+            send(400, {'error': str(err)})
+            return
+        if result is None:
+            send(404, {'error': f'no such query: {self.path}'})
+        else:
+            send(200, result)
+
+def serve(port=SERVE_PORT):
+    """
+    Answer queries over HTTP on localhost:port until interrupted
+    """
+    current_index()
+    with ThreadingHTTPServer(("127.0.0.1", port), QueryHandler) as server:
+        server.serve_forever()
+
+if __name__ == "__main__":
+    if sys.argv[1] == "serve":
+        serve(*map(int, sys.argv[2:3]))
+    else:
+        print(json.dumps(run_query(sys.argv[1]), indent=1))
@@ -0,0 +1,144 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Columnar season store.  Each game's batter and pitcher records are
+appended as typed Parquet files partitioned by date:
+
+    store/batters/day=YYYYMMDD/part-<game number>.parquet
+    store/pitchers/day=YYYYMMDD/part-<game number>.parquet
+
+A day's games are written to a staging partition (store/_staging/...,
+which queries do not see) and swapped in by commit_day once every game
+is in, so a day that fails part way keeps its old records.
+
+Queries read only the columns and date partitions that they ask for.
+"""
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+STORE_DIR = "store"
+STAGING_DIR = os.sep.join([STORE_DIR, "_staging"])
+STAT_TYPE = pa.int16()
+TEXT_CODE = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMAS = {
+    'batters': pa.schema([('NAME', pa.string()), ('TEAM', TEXT_CODE),
+                          ('DATE', pa.date32()), ('POS', TEXT_CODE),
+                          ('AB', STAT_TYPE), ('R', STAT_TYPE),
+                          ('H', STAT_TYPE), ('RBI', STAT_TYPE),
+                          ('HR', STAT_TYPE), ('SB', STAT_TYPE),
+                          ('ID', pa.string())]),
+    'pitchers': pa.schema([('NAME', pa.string()), ('TEAM', TEXT_CODE),
+                           ('DATE', pa.date32()), ('WINS', STAT_TYPE),
+                           ('SAVES', STAT_TYPE), ('OUTS', STAT_TYPE),
+                           ('ER', STAT_TYPE), ('WH', STAT_TYPE),
+                           ('SO', STAT_TYPE), ('ID', pa.string())])}
+
+PARTITIONING = ds.partitioning(pa.schema([('day', pa.string())]),
+                               flavor="hive")
+
+def part_dir(kind, day_str, staged=False):
+    """
+    Directory holding one date's records for kind (batters or pitchers),
+    or its staging directory
+    """
+    return os.sep.join([STAGING_DIR if staged else STORE_DIR, kind,
+                        f"day={day_str}"])
+
+def to_arrow(kind, frame):
+    """
+    Convert a parse_box_main DataFrame into a typed arrow table
+    """
+    def typed_col(field):
+        if field.name == 'DATE':
+            return pa.array(pd.to_datetime(frame['DATE'], format="%m/%d/%Y")
+                            .dt.date.tolist(), type=pa.date32())
+        if field.type == STAT_TYPE:
+            return pa.array(pd.to_numeric(frame[field.name]).round()
+                            .astype('int16').to_numpy(), type=STAT_TYPE)
+        if field.type == TEXT_CODE:
+            return pa.array(frame[field.name].astype(str).tolist(),
+                            type=pa.string()).dictionary_encode()
+        return pa.array(frame[field.name].astype(str).tolist(),
+                        type=pa.string())
+    return pa.Table.from_arrays(list(map(typed_col, SCHEMAS[kind])),
+                                schema=SCHEMAS[kind])
+
+def write_part(kind, day_str, frame, part_no=0, staged=False):
+    """
+    Write (or replace) one file of the partition for a date
+    """
+    os.makedirs(part_dir(kind, day_str, staged), exist_ok=True)
+    pq.write_table(to_arrow(kind, frame),
+                   os.sep.join([part_dir(kind, day_str, staged),
+                                f"part-{part_no}.parquet"]))
+
+def clear_day(date_v, staged=False):
+    """
+    Remove a date's records (or its staged records)
+    """
+    list(map(lambda a: shutil.rmtree(part_dir(
+        a, date_v.strftime("%Y%m%d"), staged), ignore_errors=True),
+             SCHEMAS))
+
+def append_game(date_v, game_no, bat_df, pit_df):
+    """
+    Stage one game's batter and pitcher DataFrames for a date (see
+    commit_day)
+    """
+    write_part('batters', date_v.strftime("%Y%m%d"), bat_df, game_no, True)
+    write_part('pitchers', date_v.strftime("%Y%m%d"), pit_df, game_no,
+               True)
+
+def commit_day(date_v):
+    """
+    Replace a date's records with its staged games
+    """
+    def swap(kind):
+        old = part_dir(kind, day_str, True) + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.isdir(part_dir(kind, day_str)):
+            os.replace(part_dir(kind, day_str), old)
+        if os.path.isdir(part_dir(kind, day_str, True)):
+            os.makedirs(os.path.dirname(part_dir(kind, day_str)),
+                        exist_ok=True)
+            os.replace(part_dir(kind, day_str, True),
+                       part_dir(kind, day_str))
+        shutil.rmtree(old, ignore_errors=True)
+    day_str = date_v.strftime("%Y%m%d")
+    list(map(swap, SCHEMAS))
+
+def day_filter(start, end):
+    """
+    Partition filter for start <= day <= end (YYYYmmdd strings or None)
+    """
+    def add_end(expr):
+        if end is None:
+            return expr
+        if expr is None:
+            return ds.field('day') <= end
+        return expr & (ds.field('day') <= end)
+    if start is None:
+        return add_end(None)
+    return add_end(ds.field('day') >= start)
+
+def read_season(kind, columns=None, start=None, end=None):
+    """
+    Return a DataFrame of kind (batters or pitchers) records, reading only
+    the requested columns and the date partitions from start to end
+    (YYYYmmdd strings, either may be None).  The frame keeps the store's
+    compact types (see stat_records): int16 stats, categorical text and
+    a datetime DATE.
+    """
+    def rs_inner(dataset):
+        return dataset.to_table(columns=columns,
+                                filter=day_filter(start, end)).to_pandas(
+                                    strings_to_categorical=True,
+                                    date_as_object=False)
+    return rs_inner(ds.dataset(os.sep.join([STORE_DIR, kind]),
+                               schema=SCHEMAS[kind].append(
+                                   pa.field('day', pa.string())),
+                               format="parquet", partitioning=PARTITIONING))
@@ -0,0 +1,167 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Incremental season-to-date totals built from the daily records.
+
+Each day's contribution (per player) is saved in a ledger file,
+results/totals_ledger/YYYYMMDD.json.  Folding in a day subtracts that
+day's old ledger entry (if the day is being reprocessed) and adds the
+new one, so an update only touches the players who played that day.
+
+The ledger entry and the totals are saved so that a crash between the
+two writes cannot leave them out of step (see write_fold).
+"""
+import os
+import json
+import time
+import threading
+from functools import reduce
+
+TOTALS_FILE = os.sep.join(['results', 'season_totals.json'])
+LEDGER_DIR = os.sep.join(['results', 'totals_ledger'])
+STATS = {'batters': ['AB', 'R', 'H', 'RBI', 'HR', 'SB'],
+         'pitchers': ['WINS', 'SAVES', 'OUTS', 'ER', 'WH', 'SO']}
+TOTALS_LOCK = threading.Lock()
+
+def player_key(row):
+    """
+    Key used to identify a player across days: the player ID, or
+    NAME|TEAM for rows without one
+    """
+    if row.get('ID'):
+        return row['ID']
+    return f"{row['NAME']}|{row['TEAM']}"
+
+def new_entry(kind, row):
+    """
+    Zeroed totals for the player on row
+    """
+    return dict([['ID', row.get('ID', '')], ['NAME', row['NAME']],
+                 ['TEAM', row['TEAM']], ['G', 0]] +
+                list(map(lambda a: [a, 0], STATS[kind])))
+
+def empty_contribution():
+    """
+    A day's contribution before any rows are added
+    """
+    return dict(map(lambda a: [a, {}], STATS))
+
+def add_rows(contribution, kind, rows):
+    """
+    Sum rows (dicts) of kind into a day's contribution, in place
+    """
+    def add_row(totals, row):
+        def add_stat(stat):
+            entry[stat] += int(round(row[stat]))
+        entry = totals.setdefault(player_key(row), new_entry(kind, row))
+        entry['G'] += 1
+        list(map(add_stat, STATS[kind]))
+        return totals
+    reduce(add_row, rows, contribution[kind])
+    return contribution
+
+def apply_contribution(totals, contribution, sign):
+    """
+    Add (sign 1) or subtract (sign -1) a day's contribution in place.
+    Players left with no games are dropped.
+    """
+    def apply_kind(kind):
+        def apply_player(key):
+            def upd_stat(stat):
+                totals[kind][key][stat] = totals[kind][key].get(stat, 0) + \
+                    sign * contribution[kind][key][stat]
+            if key not in totals[kind]:
+                totals[kind][key] = {
+                    'ID': contribution[kind][key].get('ID', ''),
+                    'NAME': contribution[kind][key]['NAME'],
+                    'TEAM': contribution[kind][key]['TEAM']}
+            list(map(upd_stat, ['G'] + STATS[kind]))
+            if totals[kind][key]['G'] <= 0:
+                del totals[kind][key]
+        list(map(apply_player, contribution[kind]))
+    list(map(apply_kind, STATS))
+    return totals
+
+def read_json(fname, default):
+    """
+    Load a json file (default if it does not exist)
+    """
+    if not os.path.exists(fname):
+        return default
+    with open(fname, 'r', encoding='utf-8') as inf:
+        return json.load(inf)
+
+def write_json(fname, data):
+    """
+    Write a json file (via a temporary file and rename)
+    """
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    with open(fname + '.tmp', 'w', encoding='utf-8') as outf:
+        json.dump(data, outf)
+    os.replace(fname + '.tmp', fname)
+
+def ledger_name(date_str):
+    """
+    Ledger file holding one date's contribution
+    """
+    return os.sep.join([LEDGER_DIR, f'{date_str}.json'])
+
+def settle_pending(ledger_dir, totals):
+    """
+    Finish folds that stopped part way.  A pending ledger entry whose
+    token the totals carry was applied, so it becomes the day's ledger
+    entry; any other pending entry was not, and is dropped.
+    """
+    def settle(fname):
+        def settle_inner(pending):
+            if pending is not None and pending['token'] == \
+                    totals.get('applied', {}).get(
+                        os.path.basename(fname).split('.')[0]):
+                write_json(fname[:-len('.pending')], pending['data'])
+            os.remove(fname)
+        settle_inner(read_json(fname, None))
+    if os.path.isdir(ledger_dir):
+        list(map(settle, map(lambda a: os.sep.join([ledger_dir, a]),
+                             filter(lambda a: a.endswith('.pending'),
+                                    os.listdir(ledger_dir)))))
+    return totals
+
+def write_fold(ledger_file, date_str, new, totals_file, totals):
+    """
+    Save a folded day.  The new ledger entry is first written as pending
+    with a token, then the totals (recording the token for the day), and
+    then the ledger entry itself.  A crash at any point leaves either
+    the old or the new fold, which settle_pending completes.
+    """
+    def wf_inner(token):
+        totals.setdefault('applied', {})[date_str] = token
+        write_json(ledger_file + '.pending', {'token': token, 'data': new})
+        write_json(totals_file, totals)
+        write_json(ledger_file, new)
+        os.remove(ledger_file + '.pending')
+        return totals
+    return wf_inner(str(time.time_ns()))
+
+def read_totals():
+    """
+    Current season-to-date totals
+    """
+    return read_json(TOTALS_FILE, {'batters': {}, 'pitchers': {},
+                                   'days': []})
+
+def fold_contribution(date_str, contribution):
+    """
+    Fold one day's contribution into the season totals, replacing any
+    earlier contribution for the same date
+    """
+    def fold_inner(totals, old, new):
+        if old is not None:
+            apply_contribution(totals, old, -1)
+        apply_contribution(totals, new, 1)
+        totals['days'] = sorted(set(totals['days']) | {date_str})
+        return write_fold(ledger_name(date_str), date_str, new, TOTALS_FILE,
+                          totals)
+    def fold_settled(totals):
+        return fold_inner(totals, read_json(ledger_name(date_str), None),
+                          contribution)
+    with TOTALS_LOCK:
+        return fold_settled(settle_pending(LEDGER_DIR, read_totals()))
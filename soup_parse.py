@@ -0,0 +1,32 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Build BeautifulSoup trees with the fastest parser available (lxml, or
+html.parser where lxml is not installed).  Callers pass a SoupStrainer
+so that only the nodes they need are built.
+"""
+import os
+import re
+from importlib.util import find_spec
+from bs4 import BeautifulSoup, SoupStrainer
+
+HTML_PARSER = os.environ.get("SEASON_HTML_PARSER",
+                             "lxml" if find_spec("lxml") else "html.parser")
+
+LINKS = SoupStrainer("a", href=True)
+PANELS = SoupStrainer("div", class_=re.compile(
+    r"(^|\s)gametracker-panel(--always-show-desktop)?(\s|$)"))
+PLAYER_NAMES = SoupStrainer(class_=re.compile(
+    r"(^|\s)CellPlayerName--long(\s|$)"))
+
+def make_soup(req_text, only=None):
+    """
+    Parse req_text, keeping only the parts matched by the strainer only
+    (the whole document if only is None)
+    """
+    return BeautifulSoup(req_text, HTML_PARSER, parse_only=only)
+
+def get_links(req_text):
+    """
+    Return all <a> tags with an href attribute
+    """
+    return make_soup(req_text, LINKS).find_all("a", href=True)
@@ -0,0 +1,310 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Fantasy league standings from the draft rosters and the daily records.
+
+The draft is turned once into a name -> manager index
+(data/roster_index.json, written by reformat_start_of_season from
+data/draft.xlsx, or from data/formatted_draft.xlsx), so scoring a day is
+a couple of dictionary lookups per stat line.  Lines are credited only
+on exact matches: the full name behind the line's player id against
+the drafted names (accents and suffixes ignored, see name_resolver), or
+the boxscore name against the drafted names' short forms (first
+initial and the rest of the name, matched the same way).  near_misses
+reports uncredited lines whose names fuzzily match a drafted name.
+Manager totals are updated a day at a time with a
+per-day ledger (results/standings_ledger/YYYYMMDD.json) so that a day
+can be rescored, the same way season_totals works.  pandas (and
+openpyxl, through reformat_start_of_season) are imported only to read a
+draft or rank the categories, so scoring a day does not load them.
+"""
+import os
+import json
+from functools import lru_cache, reduce
+from itertools import chain
+from season_totals import STATS, TOTALS_LOCK, read_json, write_json, \
+    settle_pending, write_fold
+from name_resolver import build_name_index, name_resolver, resolve, \
+    full_key, name_key
+from player_index import INDEX_LOCK, get_index, index_version, lookup
+from roster_index import RAW_DRAFT, INDEX_FILE, roster_names, \
+    build_roster_index
+
+DRAFT_FILE = os.sep.join(['data', 'formatted_draft.xlsx'])
+STANDINGS_FILE = os.sep.join(['results', 'standings.json'])
+LEDGER_DIR = os.sep.join(['results', 'standings_ledger'])
+HIGH_CATS = ['R', 'H', 'RBI', 'HR', 'SB', 'WINS', 'SAVES', 'OUTS', 'SO']
+LOW_CATS = ['ERA', 'WHIP']
+
+def save_roster_index(draft_file=DRAFT_FILE):
+    """
+    Build the roster index from the formatted draft and save it
+    """
+    # pylint: disable=import-outside-toplevel
+    import pandas as pd
+    def sri_inner(draft_df):
+        write_json(INDEX_FILE, {'managers': list(draft_df.columns[1:]),
+                                'players': build_roster_index(draft_df),
+                                'names': build_name_index(
+                                    roster_names(draft_df))})
+    sri_inner(pd.read_excel(draft_file))
+    get_roster_index.cache_clear()
+    get_roster_matcher.cache_clear()
+
+@lru_cache(maxsize=1)
+def get_roster_index():
+    """
+    Load the roster index (built from the draft sheet if needed).
+    Returns None if there is no draft.
+    """
+    if not os.path.exists(INDEX_FILE):
+        if os.path.exists(RAW_DRAFT):
+            # pylint: disable=import-outside-toplevel
+            from reformat_start_of_season import ingest_draft
+            ingest_draft(RAW_DRAFT, INDEX_FILE)
+        elif os.path.exists(DRAFT_FILE):
+            save_roster_index()
+        else:
+            return None
+    return read_json(INDEX_FILE, None)
+
+def known_players():
+    """
+    {full name key: set of ids} for the players in the player index
+    """
+    def add_id(names, pid):
+        names.setdefault(full_key(get_index()[pid]['name']), set()).add(pid)
+        return names
+    with INDEX_LOCK:
+        return reduce(add_id, list(get_index()), {})
+
+def index_matcher(index):
+    """
+    Memoized stat line -> manager lookup for a roster index (None for
+    undrafted players), valid until the player index changes.  Only
+    exact matches count.  A line whose player id is known is matched by
+    the player's full name.  Otherwise, or if that name is not on a
+    roster ("Mike" drafted for "Michael"), the boxscore name is matched
+    with the short form of the drafted names, unless all the drafted
+    names with that short form belong to other known players (Joe Smith
+    drafted, Josh Smith's line).
+    """
+    def im_inner(names, drafted, known):
+        def other_player(row, name):
+            return bool(known.get(full_key(name), set()) - {row['ID']})
+        def by_short(row, entry):
+            if entry is not None and drafted.get(name_key(row['NAME'])) \
+                    and all(map(lambda a: other_player(row, a),
+                                drafted[name_key(row['NAME'])])):
+                return None
+            return names['norm'].get(name_key(row['NAME']))
+        def by_id(entry):
+            if entry is None:
+                return None
+            return resolve(names, entry['name'])
+        def match(row):
+            entry = lookup(row['ID']) if row.get('ID') else None
+            return by_id(entry) or by_short(row, entry)
+        memo = {}
+        def matcher(row):
+            key = (row.get('ID'), row['NAME'])
+            if key not in memo:
+                memo[key] = match(row)
+            return memo[key]
+        return matcher
+    def add_drafted(drafted, name):
+        drafted.setdefault(name_key(name), []).append(name)
+        return drafted
+    def names_index():
+        return index.get('names') or build_name_index(
+            index['players'].items())
+    return im_inner(names_index(), reduce(add_drafted,
+                                          names_index()['exact'], {}),
+                    known_players())
+
+@lru_cache(maxsize=1)
+def get_roster_matcher(version):
+    """
+    Stat line -> manager lookup for the saved roster index, built once
+    per player index version (the argument only keys the cache)
+    """
+    del version
+    return index_matcher(get_roster_index())
+
+def roster_matcher(index):
+    """
+    Stat line -> manager lookup for index (shared for the saved index
+    until the player index changes)
+    """
+    if index is get_roster_index():
+        return get_roster_matcher(index_version())
+    return index_matcher(index)
+
+def near_misses(day_dict, index=None):
+    """
+    Lines of a day's results ({kind: [rows]}) credited to nobody whose
+    names fuzzily match a drafted name: [{'NAME', 'ID', 'TEAM',
+    'manager'}].  A report of draft names that may need fixing; these
+    lines are not scored.
+    """
+    def nm_inner(matcher, fuzzy):
+        def near(row):
+            return {'NAME': row['NAME'], 'ID': row.get('ID'),
+                    'TEAM': row['TEAM'], 'manager': fuzzy(row['NAME'])}
+        return list(filter(lambda a: a['manager'] is not None, map(
+            near, filter(lambda a: matcher(a) is None,
+                         chain.from_iterable(map(
+                             lambda a: day_dict.get(a, []), STATS))))))
+    if index is None:
+        index = get_roster_index()
+    if index is None:
+        return []
+    return nm_inner(roster_matcher(index), name_resolver(
+        index.get('names') or build_name_index(index['players'].items()),
+        True))
+
+def empty_line(kind):
+    """
+    Zeroed stat totals for kind
+    """
+    return dict(map(lambda a: [a, 0], STATS[kind]))
+
+def empty_score():
+    """
+    A day's score before any rows are added
+    """
+    return dict(map(lambda a: [a, {}], STATS))
+
+def score_rows(score, kind, rows, index=None):
+    """
+    Add rows (dicts) of kind to a day's score by manager, in place.  Rows
+    for undrafted players are skipped; nothing is scored without a draft.
+    """
+    def sr_inner(matcher):
+        def add_row(totals, row):
+            def add_stat(stat):
+                totals[manager][stat] += int(round(row[stat]))
+            manager = matcher(row)
+            if manager is None:
+                return totals
+            totals.setdefault(manager, empty_line(kind))
+            list(map(add_stat, STATS[kind]))
+            return totals
+        reduce(add_row, rows, score[kind])
+        return score
+    if index is None:
+        index = get_roster_index()
+    if index is None:
+        return score
+    return sr_inner(roster_matcher(index))
+
+def score_day(day_dict, index):
+    """
+    Sum one day's rows by manager: {kind: {manager: {stat: total}}}
+    """
+    return reduce(lambda a, b: score_rows(a, b, day_dict[b], index), STATS,
+                  empty_score())
+
+def apply_score(totals, score, sign):
+    """
+    Add (sign 1) or subtract (sign -1) a day's score in place
+    """
+    def apply_kind(kind):
+        def apply_manager(manager):
+            def upd_stat(stat):
+                totals[kind][manager][stat] += \
+                    sign * score[kind][manager][stat]
+            totals[kind].setdefault(manager, empty_line(kind))
+            list(map(upd_stat, STATS[kind]))
+        list(map(apply_manager, score[kind]))
+    list(map(apply_kind, STATS))
+    return totals
+
+def category_values(totals, managers):
+    """
+    Per-manager values for each ranked category
+    """
+    def cat_line(manager):
+        def rate(stat, per_outs):
+            if pit['OUTS'] == 0:
+                return None
+            return pit[stat] * per_outs / pit['OUTS']
+        bat = totals['batters'].get(manager, empty_line('batters'))
+        pit = totals['pitchers'].get(manager, empty_line('pitchers'))
+        return dict(list(bat.items()) + list(pit.items()) +
+                    [['ERA', rate('ER', 27)], ['WHIP', rate('WH', 3)]])
+    return dict(map(lambda a: [a, cat_line(a)], managers))
+
+def rank_categories(values):
+    """
+    Roto points: in each category the best of n managers gets n points,
+    the worst 1 (ties share the average).  Rates with no innings rank
+    last.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pandas as pd
+    def cat_points(cat):
+        def sort_value(manager):
+            if values[manager][cat] is None:
+                return float('-inf')
+            if cat in LOW_CATS:
+                return -values[manager][cat]
+            return values[manager][cat]
+        return pd.Series(dict(map(lambda a: [a, sort_value(a)], values))) \
+            .rank(method='average').to_dict()
+    def total_points(points):
+        return dict(map(lambda a: [a, sum(map(lambda b: points[b][a],
+                                              points))], values))
+    return total_points(dict(map(lambda a: [a, cat_points(a)],
+                                 HIGH_CATS + LOW_CATS)))
+
+def get_standings(totals, managers):
+    """
+    Standings rows (best first) with category values and roto points
+    """
+    def gs_inner(values, points):
+        return sorted(map(lambda a: dict(values[a], MANAGER=a,
+                                         POINTS=points[a]), managers),
+                      key=lambda a: -a['POINTS'])
+    return gs_inner(category_values(totals, managers),
+                    rank_categories(category_values(totals, managers)))
+
+def ledger_name(date_str):
+    """
+    Ledger file holding one date's score
+    """
+    return os.sep.join([LEDGER_DIR, f'{date_str}.json'])
+
+def fold_day(date_str, day_dict):
+    """
+    Score one day's results and update the standings (replacing any
+    earlier score for the same date).  Does nothing without a draft.
+    """
+    if get_roster_index() is None:
+        return None
+    return fold_score(date_str, score_day(day_dict, get_roster_index()))
+
+def fold_score(date_str, new):
+    """
+    Update the standings with one day's score (replacing any earlier
+    score for the same date).  Does nothing without a draft.
+    """
+    def fold_inner(index, totals, old):
+        if old is not None:
+            apply_score(totals, old, -1)
+        apply_score(totals, new, 1)
+        totals['days'] = sorted(set(totals['days']) | {date_str})
+        totals['standings'] = get_standings(totals, index['managers'])
+        return write_fold(ledger_name(date_str), date_str, new,
+                          STANDINGS_FILE, totals)
+    def fold_settled(totals):
+        return fold_inner(get_roster_index(), totals,
+                          read_json(ledger_name(date_str), None))
+    if get_roster_index() is None:
+        return None
+    with TOTALS_LOCK:
+        return fold_settled(settle_pending(LEDGER_DIR, read_json(
+            STANDINGS_FILE, {'batters': {}, 'pitchers': {}, 'days': []})))
+
+if __name__ == "__main__":
+    print(json.dumps(read_json(STANDINGS_FILE, {}).get('standings', []),
+                     indent=1))
@@ -0,0 +1,49 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Compact typed stat lines.  Parsed batter and pitcher rows are kept as
+DataFrames with small fixed dtypes instead of object columns: stats are
+int16 and the repeated text columns (NAME, TEAM, DATE, POS, ID) are
+categoricals, so each row holds integer codes into one shared set of
+strings.  Season-long frames (from the season store) use the same
+dtypes, with DATE as a datetime column.
+"""
+import pandas as pd
+
+STAT_DTYPE = 'int16'
+CODED_COLS = ['NAME', 'TEAM', 'DATE', 'POS', 'ID']
+
+def col_dtype(col):
+    """
+    dtype of a stat line column
+    """
+    if col in CODED_COLS:
+        return 'category'
+    return STAT_DTYPE
+
+def compact(frame):
+    """
+    Convert a batter or pitcher DataFrame to the compact dtypes
+    """
+    def to_dtype(col):
+        if col_dtype(col) == STAT_DTYPE:
+            return pd.to_numeric(frame[col]).round().astype(STAT_DTYPE)
+        return frame[col].astype(str).astype('category')
+    return pd.DataFrame(dict(map(lambda a: [a, to_dtype(a)],
+                                 frame.columns)), index=frame.index)
+
+def concat_lines(frames, columns):
+    """
+    Concatenate compact frames (an empty list gives an empty frame with
+    columns).  Categoricals are unioned rather than widened to object.
+    """
+    def cl_inner(frames):
+        if not frames:
+            return compact(pd.DataFrame(columns=columns))
+        return compact(pd.concat(frames, ignore_index=True)[columns])
+    return cl_inner(list(frames))
+
+def line_records(frame):
+    """
+    The rows of a compact frame as plain dicts (json-ready)
+    """
+    return frame.to_dict(orient='records')
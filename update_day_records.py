@@ -3,29 +3,70 @@
 Stash data in json file
 """
 import os
+import sys
 import json
+from contextlib import closing
 from datetime import datetime
 from datetime import timedelta
-import pandas as pd
-from parse_boxscore import parse_boxscore
-from find_games_given_date import find_yesterdays_games
+from stat_records import concat_lines, line_records
+from parse_boxscore import parse_boxscore, BAT_COLS, PIT_COLS
+from find_games_given_date import find_games_on_date
+from parallel import parallel_imap
+from season_store import clear_day, append_game, commit_day
+import season_totals
+from season_totals import STATS
+import standings
+import run_metrics
+from web_pages import get_page
+from page_archive import write_manifest
+from get_mlb_teams import refresh_teams
+
+def get_day_frames(yesterdays_list):
+    """
+    Concatenate the games' DataFrames into [batters, pitchers]
+    """
+    return [concat_lines(map(lambda a: a[0], yesterdays_list), BAT_COLS),
+            concat_lines(map(lambda a: a[1], yesterdays_list), PIT_COLS)]
+
+def frames_to_dict(frames):
+    """
+    Convert [batters, pitchers] DataFrames into one dict containing a
+    batter list and a pitcher list
+    """
+    return {'batters': line_records(frames[0]),
+            'pitchers': line_records(frames[1])}
 
 def get_bandp(yesterdays_list):
     """
     Convert pandas data into one dict containing a batter list and
     a pitcher list
     """
-    def xtrct(pos_no):
-        return pd.concat(list(map(lambda a: a[pos_no],
-                              yesterdays_list)), ignore_index=True)
-    return {'batters': list(xtrct(0).transpose().to_dict().values()),
-            'pitchers': list(xtrct(1).transpose().to_dict().values())}
+    return frames_to_dict(get_day_frames(yesterdays_list))
+
+def iter_games(date_v, workers=None):
+    """
+    Parse every game played on date_v, yielding [batters, pitchers] for
+    each.  Games are fetched and parsed concurrently (at most workers at a
+    time); results keep the scoreboard order so the output matches a
+    serial run.
+    """
+    def ig_inner(urls):
+        write_manifest(date_v.strftime("%Y%m%d"), urls)
+        return parallel_imap(parse_boxscore, urls, workers)
+    return ig_inner(find_games_on_date(date_v, workers))
 
-def get_big_dict():
+@run_metrics.timed("parse_games")
+def get_games_list(date_v, workers=None):
     """
-    Generate a dictionary of all players who played on a given day
+    Parse every game played on date_v into a list
     """
-    return get_bandp(list(map(parse_boxscore, find_yesterdays_games())))
+    return list(iter_games(date_v, workers))
+
+def get_day_dict(date_v, workers=None):
+    """
+    Generate a dictionary of all players who played on date_v.
+    """
+    return get_bandp(get_games_list(date_v, workers))
 
 def get_yday():
     """
@@ -33,18 +74,113 @@ def get_yday():
     """
     return datetime.now() - timedelta(days=1)
 
-def get_fname():
+def get_fname(date_v=None):
+    """
+    Generate name of output file (yesterday's if no date is given)
+    """
+    def fname_inner(fdate):
+        return os.sep.join(['results', f'{fdate.strftime("%Y%m%d")}.json'])
+    if date_v is None:
+        return fname_inner(get_yday())
+    return fname_inner(date_v)
+
+def stream_rows(fname, games):
+    """
+    Write each game's batter and pitcher rows to fname.batters.tmp and
+    fname.pitchers.tmp (one json row per line) as the game arrives, and
+    pass the row lists on.  Only one game is held at a time.
+    """
+    with open(fname + '.batters.tmp', 'w', encoding='utf-8') as batf, \
+            open(fname + '.pitchers.tmp', 'w', encoding='utf-8') as pitf:
+        for frames in games:
+            rows = list(map(line_records, frames))
+            list(map(lambda a: batf.write(json.dumps(a) + '\n'), rows[0]))
+            list(map(lambda a: pitf.write(json.dumps(a) + '\n'), rows[1]))
+            yield [frames, rows]
+
+def join_rows(fname):
+    """
+    Assemble the row files from stream_rows into the results file (the
+    same layout json.dump gives the {'batters', 'pitchers'} dict).  The
+    file is written under a temporary name and renamed, so a results
+    file is always complete.
+    """
+    def copy_rows(outf, kind):
+        with open(f'{fname}.{kind}.tmp', 'r', encoding='utf-8') as inf:
+            for lno, line in enumerate(inf):
+                outf.write((', ' if lno else '') + line.rstrip('\n'))
+        os.remove(f'{fname}.{kind}.tmp')
+    with open(fname + '.tmp', 'w', encoding='utf-8') as outf:
+        outf.write('{"batters": [')
+        copy_rows(outf, 'batters')
+        outf.write('], "pitchers": [')
+        copy_rows(outf, 'pitchers')
+        outf.write(']}')
+    os.replace(fname + '.tmp', fname)
+    return fname
+
+def discard_rows(fname, date_v):
+    """
+    Remove what a failed save_games left behind (the row files and the
+    staged store partition)
+    """
+    list(map(os.remove, filter(os.path.exists, map(
+        lambda a: f'{fname}.{a}.tmp', STATS))))
+    clear_day(date_v, True)
+
+def save_games(date_v, games):
+    """
+    Save a day's games (an iterable of [batters, pitchers] DataFrames)
+    as they arrive: each game is staged in the columnar season store
+    and its rows are written out and added to the day's totals and
+    standings score.  Once the last game is in, the staged games replace
+    the day's records, the json results file is assembled and the day
+    is folded into the season totals and standings.  If a game fails,
+    the day's old records, results and totals are left as they were.
+    """
+    def sg_inner(fname, day_str, contribution, score):
+        with closing(stream_rows(fname, games)) as streamed:
+            for game_no, [frames, rows] in enumerate(streamed):
+                append_game(date_v, game_no, *frames)
+                list(map(lambda a: season_totals.add_rows(
+                    contribution, a[0], a[1]), zip(STATS, rows)))
+                list(map(lambda a: standings.score_rows(score, a[0], a[1]),
+                         zip(STATS, rows)))
+        commit_day(date_v)
+        join_rows(fname)
+        season_totals.fold_contribution(day_str, contribution)
+        standings.fold_score(day_str, score)
+        return fname
+    os.makedirs(os.path.dirname(get_fname(date_v)), exist_ok=True)
+    clear_day(date_v, True)
+    try:
+        return sg_inner(get_fname(date_v), date_v.strftime("%Y%m%d"),
+                        season_totals.empty_contribution(),
+                        standings.empty_score())
+    except Exception:
+        discard_rows(get_fname(date_v), date_v)
+        raise
+
+@run_metrics.timed("write_day_records")
+def write_day_records(date_v, workers=None):
     """
-    Generate name of output file
+    Fetch, parse and save every game played on date_v, one game at a time
+    (refreshing the team metadata first if it is stale)
     """
-    return os.sep.join(['results', f'{get_yday().strftime("%Y%m%d")}.json'])
+    refresh_teams()
+    return save_games(date_v, iter_games(date_v, workers))
 
-def update_day_records():
+def update_day_records(workers=None, date_v=None):
     """
-    Save day's results as a json file
+    Save day's results (yesterday's if no date is given) as a json file
+    (and a run report when metrics are enabled)
     """
-    with open(get_fname(), 'w', encoding='utf-8') as outf:
-        json.dump(get_big_dict(), outf)
+    write_day_records(date_v or get_yday(), workers)
+    if run_metrics.enabled():
+        run_metrics.write_report(extra={
+            "page_memo": get_page.cache_info()._asdict()})
 
 if __name__ == "__main__":
+    if "--metrics" in sys.argv[1:]:
+        run_metrics.enable()
     update_day_records()
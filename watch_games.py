@@ -0,0 +1,124 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Watch today's games and print per-player stat changes as they happen.
+
+Every poll revalidates each boxscore with a conditional request (see
+http_cache; an unchanged page costs a 304 and no download).  Pages whose
+stat tables and baserunning text hash the same as last time are not
+parsed.  Changed games are reparsed and the differences from the last
+parse are printed as json lines.
+
+Usage: python watch_games.py [poll_seconds]
+"""
+import re
+import sys
+import json
+import time
+import hashlib
+from itertools import count
+from datetime import datetime
+from find_games_given_date import get_gdate, find_game_statuses
+from find_games_given_date import POSTPONED, SCHEDULED
+from get_boxscore import boxscore_from_text
+from parse_boxscore import do_parse_boxscore, parse_box_main
+from season_totals import STATS, player_key
+from web_pages import fetch_page, cbs_url
+from parallel import parallel_map
+
+POLL_SECONDS = 60
+SCOREBOARD_SECONDS = 10 * 60
+STAT_PARTS = re.compile(r"<table.*?</table>|BASERUNNING.{0,2000}",
+                        re.DOTALL)
+
+def todays_games(date_v):
+    """
+    Boxscore links for games on date_v that have started (the scoreboard
+    is refreshed every SCOREBOARD_SECONDS)
+    """
+    return list(map(lambda a: a.url, filter(
+        lambda a: a.status not in (POSTPONED, SCHEDULED),
+        find_game_statuses(date_v, fetch_page(get_gdate(date_v),
+                                              SCOREBOARD_SECONDS)))))
+
+def fingerprint(req_text):
+    """
+    Hash of the parts of a boxscore page that the parser uses
+    """
+    return hashlib.sha1("".join(STAT_PARTS.findall(req_text))
+                        .encode("utf-8")).hexdigest()
+
+def stat_lines(box_main):
+    """
+    {(kind, player key): row} for a parse_box_main result
+    """
+    def kind_lines(kind_frame):
+        return list(map(lambda a: [(kind_frame[0], player_key(a)), a],
+                        kind_frame[1].to_dict(orient='records')))
+    return dict(sum(map(kind_lines, zip(STATS, box_main)), []))
+
+def diff_lines(old, new):
+    """
+    Per-player stat changes between two stat_lines results
+    """
+    def line_delta(key):
+        def stat_delta(stat):
+            return [stat, int(round(new[key][stat])) -
+                    int(round(old.get(key, {}).get(stat, 0)))]
+        return dict([['kind', key[0]], ['ID', new[key].get('ID', '')],
+                     ['NAME', new[key]['NAME']], ['TEAM', new[key]['TEAM']]]
+                    + list(filter(lambda a: a[1] != 0,
+                                  map(stat_delta, STATS[key[0]]))))
+    return list(filter(lambda a: len(a) > 4, map(line_delta, new)))
+
+def poll_game(state):
+    """
+    Return a function checking one game.  state maps a game url to
+    [fingerprint, stat lines] from the previous poll (a page that cannot
+    be parsed yet keeps the last stat lines, so it is not parsed again
+    until it changes).
+    """
+    def pg_inner(url_v):
+        def parse_changed(req_text, fprint):
+            if state.get(url_v, [None])[0] == fprint:
+                return []
+            old = state.get(url_v, [None, {}])[1]
+            try:
+                new = stat_lines(parse_box_main(do_parse_boxscore(
+                    boxscore_from_text(cbs_url(url_v), req_text))))
+            except (ValueError, IndexError, KeyError):
+                state[url_v] = [fprint, old]
+                return []
+            state[url_v] = [fprint, new]
+            return list(map(lambda a: dict(a, game=url_v),
+                            diff_lines(old, new)))
+        def check_text(req_text):
+            return parse_changed(req_text, fingerprint(req_text))
+        return check_text(fetch_page(cbs_url(url_v), 0))
+    return pg_inner
+
+def poll_once(date_v, state, workers=None):
+    """
+    Poll every game once; return the stat changes found
+    """
+    return sum(parallel_map(poll_game(state), todays_games(date_v),
+                            workers), [])
+
+def print_delta(delta):
+    """
+    Default output: one json line per change
+    """
+    print(json.dumps(dict(delta, time=datetime.now().strftime("%H:%M:%S"))),
+          flush=True)
+
+def watch(poll_seconds=POLL_SECONDS, rounds=None, emit=print_delta):
+    """
+    Poll today's games every poll_seconds (forever, or rounds times)
+    """
+    state = {}
+    for _ in count() if rounds is None else range(rounds):
+        list(map(emit, poll_once(datetime.now(), state)))
+        time.sleep(poll_seconds)
+    return state
+
+if __name__ == "__main__":
+    watch(*map(int, sys.argv[1:2]))
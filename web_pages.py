@@ -0,0 +1,67 @@
+# Copyright (C) 2023 Warren Usui, MIT License
+"""
+Read web pages.  Each page is downloaded once per run and the same text
+is handed to every parser that needs it.
+
+get_page keeps pages that are read again and again (the scoreboard) in
+memory.  A boxscore is read once to be checked and once to be parsed,
+so it is held by keep_page only until take_page hands it to the parser;
+no more boxscores are held than there are games in flight.
+"""
+import threading
+from functools import lru_cache
+from http_cache import cached_get
+from run_metrics import timed
+
+CBS_SITE = "https://www.cbssports.com"
+KEPT_PAGES = {}
+KEPT_LOCK = threading.Lock()
+
+def cbs_url(path):
+    """
+    Add start of http information to a cbssports path
+    """
+    return CBS_SITE + path
+
+@timed("fetch_page")
+def fetch_page(url, max_age=None):
+    """
+    Read a url through the on-disk cache (see http_cache)
+    """
+    return cached_get(url, max_age)
+
+@lru_cache(maxsize=64)
+def get_page(url):
+    """
+    Read a url.  Repeated reads of the same url during a run are answered
+    from memory.
+    """
+    return fetch_page(url)
+
+def keep_page(url):
+    """
+    Read a url and hold the text until take_page (or drop_page) is
+    called for it
+    """
+    with KEPT_LOCK:
+        if url in KEPT_PAGES:
+            return KEPT_PAGES[url]
+    return KEPT_PAGES.setdefault(url, fetch_page(url))
+
+def take_page(url):
+    """
+    Read a url, handing over (and no longer holding) the text kept by
+    keep_page if there is one
+    """
+    with KEPT_LOCK:
+        text = KEPT_PAGES.pop(url, None)
+    if text is None:
+        return fetch_page(url)
+    return text
+
+def drop_page(url):
+    """
+    Stop holding a page kept by keep_page
+    """
+    with KEPT_LOCK:
+        KEPT_PAGES.pop(url, None)